@@ -19,17 +19,185 @@ file if no filename is provided as an argument.
 
 import sys
 import io
+import os
+import re
+import hashlib
+import sqlite3
+from collections import namedtuple
 from datetime import datetime
 from pathlib import Path
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
 # Configuration
 BASE_DIR = r"C:\Users\Marco.Africani\Desktop\Month recap"
 LEARNING_DB_FILE = rf"{BASE_DIR}\wine_names_learning_db.txt"
 CORRECTIONS_DIR = rf"{BASE_DIR}\Outputs\Detailed match results"  # Look for corrections files here
 
+# One parsed correction from a CORRECTIONS_NEEDED file
+Correction = namedtuple('Correction', 'wine_name vintage item_no')
+
+# Entry field lines in corrections files; these are never treated as headers,
+# so a wine name that happens to contain a skip marker is still read
+ENTRY_FIELD_PREFIXES = ('Name:', 'Vintage:', 'CHF Price:', 'Min Qty:', 'Wine:', 'Item No.:', 'REASON:', '>>> CORRECTED_ITEM_NO:')
+
+# Header/separator lines in corrections files that never carry entry data
+SKIP_PREFIXES = ('#', '=', '-', '[')
+SKIP_MARKERS = ('INSTRUCTIONS', 'Format:', 'FORMAT:', 'Generated:', 'WINE CORRECTIONS FILE', 'PROCESSING COMPLETE')
+
+# Learning DB entry line: Wine Name | Vintage | Item No. [| Timestamp ...]
+# Captures the whole stripped line plus the three key fields; comment lines are skipped
+LEARNING_DB_LINE_RE = re.compile(r'^[ \t]*((?!#)(.*?) \| (.*?) \| (.*?)(?: \| .*)?)[ \t\r]*$', re.MULTILINE)
+
+
+def learning_db_digest(data):
+    """SHA-256 hex digest of learning DB bytes, used to recognize an already-read prefix"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_learning_db_update(path, offset, digest):
+    """
+    Read what was added to the learning database since it was last read up to `offset`.
+
+    `digest` is the learning_db_digest() of those first `offset` bytes. Writers only ever
+    append, so normally just the bytes after `offset` are returned. If the file is shorter
+    than `offset` or its first `offset` bytes changed (an edit in place, even one that made
+    the file longer), the whole file is returned with start 0 and the caller must drop
+    everything it built from the old content.
+
+    Returns (data, start, end, digest): the bytes from start to end of the file, and the
+    digest of the whole file for the next call.
+    Raises FileNotFoundError if the learning database does not exist.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    start = offset
+    if offset and (len(content) < offset or learning_db_digest(memoryview(content)[:offset]) != digest):
+        start = 0
+
+    return content[start:], start, len(content), learning_db_digest(content)
+
+
+class LearningDBIndex:
+    """
+    Persistent key index for the learning database.
+
+    Keeps a SQLite sidecar next to the learning database with one row per unique
+    (wine_name, vintage, item_no) key, so duplicate checks are a single indexed lookup
+    instead of a full scan of the text file. The text file stays the source of truth:
+    the index remembers the file size, mtime and content digest it was built from, so
+    an unchanged file is not parsed at all, lines appended since the last run are
+    imported on open, and the index is rebuilt from scratch if the indexed part of the
+    file was edited in place.
+    """
+
+    # Bump when the table layout changes; older sidecars are dropped and rebuilt
+    SCHEMA_VERSION = 3
+
+    def __init__(self, learning_db_path):
+        self.learning_db_path = learning_db_path
+        self.index_path = learning_db_path + '.sqlite'
+        self.conn = sqlite3.connect(self.index_path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS entries")
+            self.conn.execute("DROP TABLE IF EXISTS meta")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries("
+            "wine_name TEXT, vintage TEXT, item_no TEXT, line TEXT, "
+            "PRIMARY KEY (wine_name, vintage, item_no))"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta(name TEXT PRIMARY KEY, value)")
+        self._sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _get_meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_fingerprint(self, offset, mtime_ns, digest):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta(name, value) VALUES (?, ?)",
+            [('offset', offset), ('mtime_ns', mtime_ns), ('digest', digest)]
+        )
+        self.offset = offset
+        self.digest = digest
+
+    def _sync(self):
+        """Import lines appended to the learning database since the last sync"""
+        self.offset = self._get_meta('offset')
+        self.digest = self._get_meta('digest')
+        if Path(self.learning_db_path).exists():
+            stat = os.stat(self.learning_db_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        else:
+            size, mtime_ns = 0, 0
+
+        # Unchanged since the last sync - nothing to parse
+        if size == self.offset and mtime_ns == self._get_meta('mtime_ns'):
+            return
+
+        if size:
+            data, start, end, digest = read_learning_db_update(self.learning_db_path, self.offset, self.digest)
+        else:
+            data, start, end, digest = b'', 0, 0, learning_db_digest(b'')
+
+        if start < self.offset:
+            # Indexed part of the file was truncated or edited in place - rebuild the index
+            self.conn.execute("DELETE FROM entries")
+
+        # Extract (line, wine_name, vintage, item_no) from every entry line in one pass
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO entries(line, wine_name, vintage, item_no) VALUES (?, ?, ?, ?)",
+            LEARNING_DB_LINE_RE.findall(data.decode('utf-8'))
+        )
+
+        self._set_fingerprint(end, mtime_ns, digest)
+        self.conn.commit()
+
+    def contains(self, key):
+        """Check whether a (wine_name, vintage, item_no) key is already in the database"""
+        return self.conn.execute(
+            "SELECT 1 FROM entries WHERE wine_name = ? AND vintage = ? AND item_no = ?", key
+        ).fetchone() is not None
+
+    def record_append(self, entries, start, end):
+        """
+        Record (key, line) entries just appended to the learning database.
+
+        start/end are the file positions before and after the append. If nothing else
+        was written since the last sync, the fingerprint is moved past our own lines
+        so the next run does not re-read them.
+        """
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO entries(wine_name, vintage, item_no, line) VALUES (?, ?, ?, ?)",
+            (key + (line,) for key, line in entries)
+        )
+        if start == self.offset:
+            mtime_ns = os.stat(self.learning_db_path).st_mtime_ns
+            with open(self.learning_db_path, 'rb') as f:
+                content = f.read(end)
+            # Only skip our lines if the part indexed before them is still the same
+            if learning_db_digest(memoryview(content)[:start]) == self.digest:
+                self._set_fingerprint(end, mtime_ns, learning_db_digest(content))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def write_log_lines(log_lines):
+    """Write a batch of collected per-entry messages to stdout in one call"""
+    if log_lines:
+        sys.stdout.write("\n".join(log_lines) + "\n")
+
 
 def parse_corrections_file(corrections_file):
     """
@@ -53,44 +221,45 @@ def parse_corrections_file(corrections_file):
     """
     corrections = []
     current_entry = {}
+    log_lines = []  # Per-entry messages, written in one batch
 
     try:
-        with open(corrections_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        lines = Path(corrections_file).read_text(encoding='utf-8').splitlines()
 
         for line in lines:
             line_stripped = line.strip()
 
-            # Skip empty lines and headers
-            if not line_stripped or line_stripped.startswith('='):
+            # Skip empty lines and headers (entry fields are checked first)
+            if not line_stripped:
                 continue
+            if not line_stripped.startswith(ENTRY_FIELD_PREFIXES):
+                if line_stripped.startswith(SKIP_PREFIXES) or any(marker in line_stripped for marker in SKIP_MARKERS):
+                    continue
 
             # Check for manual correction field
             if 'CORRECTED_ITEM_NO:' in line:
                 # Extract the manually entered Item Number
-                parts = line.split('CORRECTED_ITEM_NO:')
+                parts = line.split('CORRECTED_ITEM_NO:', 1)
                 if len(parts) >= 2:
                     corrected_item_no = parts[1].strip()
 
                     # Only process if user entered a value
                     if corrected_item_no and corrected_item_no != '':
                         # Validate Item No is numeric
-                        try:
-                            int(corrected_item_no)
-                            current_entry['corrected_item_no'] = corrected_item_no
-                        except ValueError:
-                            print(f"⚠️  Invalid Item No '{corrected_item_no}' - skipping")
+                        if not corrected_item_no.isdigit():
+                            log_lines.append(f"⚠️  Invalid Item No '{corrected_item_no}' - skipping")
                             current_entry = {}
                             continue
+                        current_entry['corrected_item_no'] = corrected_item_no
 
                 # Finalize current entry if we have all required fields
                 if current_entry.get('wine_name') and current_entry.get('vintage') and current_entry.get('corrected_item_no'):
-                    corrections.append({
-                        'wine_name': current_entry['wine_name'],
-                        'vintage': current_entry['vintage'],
-                        'item_no': current_entry['corrected_item_no']
-                    })
-                    print(f"✅ Found correction: {current_entry['wine_name']} {current_entry['vintage']} → Item No. {current_entry['corrected_item_no']}")
+                    corrections.append(Correction(
+                        current_entry['wine_name'],
+                        current_entry['vintage'],
+                        current_entry['corrected_item_no']
+                    ))
+                    log_lines.append(f"✅ Found correction: {current_entry['wine_name']} {current_entry['vintage']} → Item No. {current_entry['corrected_item_no']}")
 
                 # Reset for next entry
                 current_entry = {}
@@ -102,10 +271,15 @@ def parse_corrections_file(corrections_file):
             elif line_stripped.startswith('Vintage:') and 'wine_name' in current_entry:
                 current_entry['vintage'] = line_stripped.replace('Vintage:', '').strip()
 
+        write_log_lines(log_lines)
+
     except FileNotFoundError:
+        # Messages collected so far go first, so the error stays the last line
+        write_log_lines(log_lines)
         print(f"❌ Error: Corrections file not found: {corrections_file}")
         return None
     except Exception as e:
+        write_log_lines(log_lines)
         print(f"❌ Error reading corrections file: {e}")
         return None
 
@@ -117,58 +291,76 @@ def apply_corrections_to_learning_db(corrections, learning_db_path):
     Apply corrections to the learning database.
     Only adds entries if they don't already exist.
     """
-    # Load existing database keys
-    existing_keys = set()
+    # Nothing to apply - don't touch the learning database at all
+    if not corrections:
+        print(f"\n✅ No new corrections to add")
+        return True
 
-    if Path(learning_db_path).exists():
-        try:
-            with open(learning_db_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        # Extract key: wine_name|vintage|item_no
-                        parts = line.split(' | ')
-                        if len(parts) >= 3:
-                            key = f"{parts[0]}|{parts[1]}|{parts[2]}"
-                            existing_keys.add(key)
-        except Exception as e:
-            print(f"⚠️  Warning: Could not read learning database: {e}")
+    # Open the persistent key index (imports any new learning database lines)
+    try:
+        idx = LearningDBIndex(learning_db_path)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not read learning database: {e}")
+        idx = None
 
-    # Apply corrections
-    new_entries = []
+    try:
+        return _apply_corrections(corrections, learning_db_path, idx)
+    finally:
+        if idx is not None:
+            idx.close()
+
+
+def _apply_corrections(corrections, learning_db_path, idx):
+    """Append corrections whose keys are not yet in the index"""
+    # Apply corrections (one timestamp for the whole batch)
+    # new_entries maps each key added during this run to its learning DB line,
+    # so the in-run duplicate check and the pending write share one dict
+    new_entries = {}
     duplicate_count = 0
+    log_lines = []  # Per-correction messages, written in one batch
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     for correction in corrections:
-        wine_name = correction['wine_name']
-        vintage = correction['vintage']
-        item_no = correction['item_no']
+        wine_name, vintage, item_no = correction
 
         # Create unique key
-        key = f"{wine_name}|{vintage}|{item_no}"
+        key = (wine_name, vintage, item_no)
 
         # Only add if not already in database
-        if key not in existing_keys:
+        if key not in new_entries and not (idx is not None and idx.contains(key)):
             # Format: Wine Name | Vintage | Item No. | Timestamp
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            entry_line = f"{wine_name} | {vintage} | {item_no} | {timestamp} (manual correction)"
-            new_entries.append(entry_line)
-            existing_keys.add(key)
-            print(f"✅ Adding correction: {wine_name} {vintage} → Item No. {item_no}")
+            new_entries[key] = f"{wine_name} | {vintage} | {item_no} | {timestamp} (manual correction)"
+            log_lines.append(f"✅ Adding correction: {wine_name} {vintage} → Item No. {item_no}")
         else:
             duplicate_count += 1
-            print(f"⏭️  Skipping duplicate: {wine_name} {vintage} → Item No. {item_no}")
+            log_lines.append(f"⏭️  Skipping duplicate: {wine_name} {vintage} → Item No. {item_no}")
+
+    write_log_lines(log_lines)
 
     # Write new entries to database
     if new_entries:
         try:
-            with open(learning_db_path, 'a', encoding='utf-8') as f:
-                for entry in new_entries:
-                    f.write(entry + "\n")
+            # Single O_APPEND write for the whole batch, so a concurrent writer
+            # (GUI or matcher) cannot interleave with our lines
+            payload = "".join(entry + "\n" for entry in new_entries.values()).encode('utf-8')
+            flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+            fd = os.open(learning_db_path, flags, 0o644)
+            try:
+                start = os.lseek(fd, 0, os.SEEK_END)
+                written = os.write(fd, payload)
+                while written < len(payload):
+                    written += os.write(fd, payload[written:])
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+            finally:
+                os.close(fd)
 
             print(f"\n✅ Successfully added {len(new_entries)} corrections to learning database")
             if duplicate_count > 0:
                 print(f"   ⏭️  Skipped {duplicate_count} duplicates")
-            print(f"   Total unique entries in database: {len(existing_keys)}")
+
+            if idx is not None:
+                idx.record_append(new_entries.items(), start, end)
+                print(f"   Total unique entries in database: {len(idx)}")
 
         except Exception as e:
             print(f"\n❌ Error writing to learning database: {e}")
@@ -188,35 +380,45 @@ def find_latest_corrections_file(directory=None):
     Returns:
         Path to the latest corrections file, or None if not found
     """
-    import glob
-    import os
-
     if directory is None:
         directory = CORRECTIONS_DIR
 
-    # Find all corrections files
-    pattern = str(Path(directory) / "CORRECTIONS_NEEDED_*.txt")
-    corrections_files = glob.glob(pattern)
-
-    if not corrections_files:
+    # Track the most recently modified corrections file in one pass over the directory
+    # (DirEntry caches the stat result)
+    latest_path = None
+    latest_mtime = None
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('CORRECTIONS_NEEDED_') and entry.name.endswith('.txt'):
+                    mtime = entry.stat().st_mtime
+                    if latest_mtime is None or mtime > latest_mtime:
+                        latest_path = entry.path
+                        latest_mtime = mtime
+    except FileNotFoundError:
         return None
 
-    # Sort by modification time (most recent first)
-    corrections_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
+    return latest_path
 
-    return corrections_files[0]
 
+def main(argv=None):
+    """Main execution function (argv defaults to the command line arguments)"""
+    if argv is None:
+        argv = sys.argv[1:]
 
-def main():
-    """Main execution function"""
     print("="*100)
     print("Apply Manual Corrections to Learning Database")
     print("="*100 + "\n")
 
     # Check if a specific file was provided as argument
-    if len(sys.argv) >= 2:
-        corrections_file = sys.argv[1]
+    if argv:
+        corrections_file = argv[0]
         print(f"📄 Using specified file: {corrections_file}")
+
+        # Check if file exists (auto-detected files are known to exist)
+        if not Path(corrections_file).exists():
+            print(f"❌ Error: File not found: {corrections_file}")
+            return
     else:
         # Auto-detect latest corrections file
         print("🔍 Searching for latest corrections file...")
@@ -234,11 +436,6 @@ def main():
         print(f"✅ Found latest corrections file: {Path(corrections_file).name}")
         print(f"   Modified: {datetime.fromtimestamp(Path(corrections_file).stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')}")
 
-    # Check if file exists
-    if not Path(corrections_file).exists():
-        print(f"❌ Error: File not found: {corrections_file}")
-        return
-
     print(f"📄 Corrections file: {corrections_file}")
     print(f"📚 Learning database: {LEARNING_DB_FILE}\n")
 
@@ -269,4 +466,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Fix encoding for Windows console (block-buffered: per-correction logs are written in batches)
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=False, write_through=False)
     main()
@@ -7,20 +7,219 @@ A stylish desktop application for wine document processing
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
 from pathlib import Path
+import bisect
+import concurrent.futures
+import contextlib
+from collections import deque
+import functools
+import importlib
+import io
 import subprocess
+import tempfile
 import threading
+import time
+import traceback
 import sys
 import os
+import re
 from PIL import Image, ImageTk
 
+from apply_corrections import find_latest_corrections_file, read_learning_db_update
+from job_control import CANCEL_EVENT, JobCancelled
+
 # Configuration
 BASE_DIR = r"C:\Users\Marco.Africani\Desktop\Month recap"
 DATABASE_DIR = r"C:\Users\Marco.Africani\OneDrive - AVU SA\AVU CPI Campaign\Puzzle_control_Reports\SOURCE_FILES"
 DEFAULT_MULTI_FILE = rf"{BASE_DIR}\Inputs\Multi.txt"  # Changed from month recap.docx to Multi.txt
 DEFAULT_WINE_LIST = rf"{BASE_DIR}\Inputs\ItemNoGenerator.txt"
+DEFAULT_MULTI_DIR = Path(DEFAULT_MULTI_FILE).parent
+DEFAULT_WINE_LIST_DIR = Path(DEFAULT_WINE_LIST).parent
 LOGO_PATH = rf"{BASE_DIR}\static\images\spinner.jpg"
+LOGO_CACHE = Path(tempfile.gettempdir()) / "avu_logo_32.png"  # 32x32 logo reused across launches
 LEARNING_DB = rf"{BASE_DIR}\wine_names_learning_db.txt"
-OUTPUTS_DIR = rf"{BASE_DIR}\Outputs"
+OUTPUTS_DIR = Path(rf"{BASE_DIR}\Outputs")
+CORRECTIONS_DIR = rf"{BASE_DIR}\Outputs\Detailed match results"
+TEMP_WINE_INPUT = Path(tempfile.gettempdir()) / "avu_temp_wine_input.txt"  # Direct matcher input
+OMT_EXCEL_FILE = rf"{DATABASE_DIR}\OMT Main Offer List.xlsx"
+
+# CHF price patterns for direct paragraph conversion
+CHF_PREFIX_RE = re.compile(r"CHF\s+(\d+(?:'\d{3})*\.?\d{0,2})", re.IGNORECASE)  # "CHF XX.XX"
+CHF_SUFFIX_RE = re.compile(r"(\d+(?:'\d{3})*\.?\d{0,2})\s+CHF", re.IGNORECASE)  # "XX.XX CHF"
+CHF_WORD_RE = re.compile(r'\bCHF\b', re.IGNORECASE)
+STRIP_THOUSANDS_SEP = str.maketrans('', '', "'")  # Swiss thousands separator, as in 1'250.00
+PRICE_TOLERANCE_CENTS = 1  # A CHF price this close to a known one takes its EUR price
+
+# CORRECTIONS_NEEDED field labels -> keys of a parsed correction entry
+CORRECTION_FIELDS = {
+    'Name': 'wine_name',
+    'Vintage': 'vintage',
+    'CHF Price': 'chf_price',
+    'Wine': 'matched_wine',
+    'Item No.': 'item_no',
+    'REASON': 'reason',
+}
+
+# Interactive corrections table layout
+CORRECTION_TABLE_COLUMNS = ('wine', 'vintage', 'price', 'suggested', 'correct', 'reason')
+CORRECTION_TABLE_HEADINGS = ('Wine Name', 'Vintage', 'Price', 'Suggested Item No.', 'Correct Item No.', 'Reason')
+CORRECTION_TABLE_WIDTHS = (200, 70, 70, 130, 130, 200)
+PLACEHOLDER_ITEM_NOS = frozenset({'MANUAL_ENTRY_NEEDED', 'NOT_FOUND'})  # Suggestions not worth pre-filling
+
+# Separator lines used in the results pane and reports (80 columns)
+RULE_EQ = "=" * 80
+RULE_DASH = "-" * 80
+
+# Number of most recent learning DB mappings shown in the results pane
+LEARNING_DB_DISPLAY_LIMIT = 50
+LEARNING_DB_REFRESH_DELAY_MS = 150  # Debounce window for refresh requests
+
+# Script output is inserted into the results pane in slices of this many characters
+RESULTS_CHUNK_SIZE = 65536
+RESULTS_FLUSH_INTERVAL = 0.2  # Seconds; pending output older than this is shown even if the slice is not full
+
+
+def truncate(text, limit, keep, ellipsis):
+    """Return the first `keep` characters of text plus `ellipsis` if it is longer than `limit`"""
+    return text[:keep] + ellipsis if len(text) > limit else text
+
+
+class LearningDBTail:
+    """Running summary of the learning DB, updated from the lines appended since the last read
+
+    Every writer only appends to the learning DB, so a refresh after a matcher
+    run or an apply parses just the new lines. The summary remembers the file
+    size, mtime and content digest it was built from: an unchanged file is not
+    parsed at all, and a file whose already-read part shrank or was edited in
+    place is parsed from the start.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.mtime_ns = 0
+        self.digest = None
+        self.latest_entries = deque(maxlen=LEARNING_DB_DISPLAY_LIMIT)
+        self.valid_count = 0
+        self.not_found_count = 0
+
+    def read(self):
+        """Return (latest valid entries, valid count, NOT_FOUND count)
+
+        Entries are decoded (wine, vintage, item_no) tuples, oldest first.
+        Raises FileNotFoundError if the learning DB does not exist.
+        """
+        try:
+            stat = os.stat(self.path)
+            if stat.st_size != self.offset or stat.st_mtime_ns != self.mtime_ns:
+                # Same prefix check as the apply_corrections key index
+                data, start, end, digest = read_learning_db_update(self.path, self.offset, self.digest)
+                if start < self.offset:
+                    # Truncated or edited in place - start over
+                    self.reset()
+
+                # Parse only the appended bytes; entries stay bytes until displayed
+                for line in data.splitlines():
+                    line = line.strip()
+                    if line and not line.startswith(b'#'):
+                        parts = line.split(b' | ', 3)
+                        if len(parts) >= 3:
+                            item_no = parts[2].split(None, 1)[0]  # Get just the item number
+
+                            if item_no == b'NOT_FOUND':
+                                self.not_found_count += 1
+                            else:
+                                self.valid_count += 1
+                                self.latest_entries.append((parts[0], parts[1], item_no))
+                self.offset = end
+                self.digest = digest
+                self.mtime_ns = stat.st_mtime_ns
+        except Exception:
+            self.reset()
+            raise
+
+        entries = tuple(
+            tuple(field.decode('utf-8', errors='replace') for field in entry)
+            for entry in self.latest_entries
+        )
+        return entries, self.valid_count, self.not_found_count
+
+
+class ResultsPaneWriter(io.TextIOBase):
+    """File-like sink that streams script output into the results pane
+
+    Writes are collected until RESULTS_CHUNK_SIZE characters are pending, or
+    RESULTS_FLUSH_INTERVAL has passed since the last insert, and then handed
+    to the UI thread as one insert. A long report never sits in memory as a
+    single string, and a slow run still shows its progress as it goes.
+    """
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self.pending = []
+        self.pending_size = 0
+        self.last_flush = time.monotonic()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self.app.closed:
+            return len(text)  # Window is gone, nothing left to show the output in
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= RESULTS_CHUNK_SIZE or time.monotonic() - self.last_flush >= RESULTS_FLUSH_INTERVAL:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.pending:
+            self.app.append_results(''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+        self.last_flush = time.monotonic()
+
+
+class ThreadOutputRouter(io.TextIOBase):
+    """Stand-in for sys.stdout/sys.stderr that redirects only one thread's output
+
+    contextlib.redirect_stdout swaps the stream for the whole process, so
+    anything the UI thread printed while a script ran would end up in the
+    results pane. The router is installed once; a thread inside redirect()
+    writes to its own target and every other thread to the original stream.
+    """
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream  # None under pythonw, where there is no console
+        self.local = threading.local()
+
+    def writable(self):
+        return True
+
+    def target(self):
+        return getattr(self.local, 'target', None) or self.stream
+
+    def write(self, text):
+        target = self.target()
+        return target.write(text) if target is not None else len(text)
+
+    def flush(self):
+        target = self.target()
+        if target is not None:
+            target.flush()
+
+    @contextlib.contextmanager
+    def redirect(self, target):
+        """Send the calling thread's writes to target until the block exits"""
+        self.local.target = target
+        try:
+            yield target
+        finally:
+            self.local.target = None
 
 
 class AVUEchoSpinner(tk.Tk):
@@ -40,11 +239,49 @@ class AVUEchoSpinner(tk.Tk):
         self.wine_list_path = tk.StringVar(value=DEFAULT_WINE_LIST)
         self.enable_translations = tk.BooleanVar(value=True)  # Translation checkbox
 
+        # CHF -> EUR map for direct paragraph conversion, rebuilt only when the OMT file changes
+        self._conversion_map = None
+        self._conversion_map_mtime = None
+        self._conversion_cents = []  # Sorted keys of the map, for nearest-price lookups
+
+        # Pending after() id of a debounced learning DB refresh
+        self._refresh_pending = None
+
+        # Learning DB summary, only read from the worker thread
+        self.learning_db_tail = LearningDBTail(LEARNING_DB)
+
+        # One worker thread runs converter/matcher/corrections jobs one at a time
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='avu')
+        self.job_buttons = []  # Disabled while a job is running
+        self.active_job = None  # Future of the last job started with start_job
+        self.closed = False  # Set when the window closes; the worker then stops touching Tk
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Scripts run on the worker thread print to sys.stdout/sys.stderr;
+        # only that thread's output is sent to the results pane
+        self.stdout_router = sys.stdout = ThreadOutputRouter(sys.stdout)
+        self.stderr_router = sys.stderr = ThreadOutputRouter(sys.stderr)
+
         self.setup_ui()
 
     def setup_ui(self):
-        """Setup the main UI components"""
+        """Setup the main UI components
+
+        Only the title bar, converter and status bar are built before the
+        window first paints. The matcher section is built once Tk is idle,
+        and the corrections panel the first time it is shown.
+        """
+        self.corrections_frame = None
+        self.correction_entries = []
 
+        self._build_title()
+        self._build_converter()
+        self._build_status()
+
+        self.after_idle(self._build_matcher)
+
+    def _build_title(self):
+        """Build the title bar with logo and version"""
         # ============ TITLE BAR ============
         title_frame = tk.Frame(self, bg="#2d2d2d", height=40)
         title_frame.pack(fill=tk.X, padx=2, pady=2)
@@ -52,9 +289,19 @@ class AVUEchoSpinner(tk.Tk):
 
         # Logo
         try:
-            logo_img = Image.open(LOGO_PATH)
-            logo_img = logo_img.resize((32, 32), Image.Resampling.LANCZOS)
-            self.logo_photo = ImageTk.PhotoImage(logo_img)
+            try:
+                cache_fresh = LOGO_CACHE.stat().st_mtime >= os.path.getmtime(LOGO_PATH)
+            except FileNotFoundError:
+                cache_fresh = False
+
+            with Image.open(LOGO_CACHE if cache_fresh else LOGO_PATH) as logo_img:
+                if not cache_fresh:
+                    logo_img.thumbnail((32, 32), Image.Resampling.BILINEAR)
+                    try:
+                        logo_img.save(LOGO_CACHE, 'PNG')
+                    except OSError:
+                        pass  # Cache is only an optimization; the resized logo is still shown
+                self.logo_photo = ImageTk.PhotoImage(logo_img)
             logo_label = tk.Label(title_frame, image=self.logo_photo, bg="#2d2d2d")
             logo_label.pack(side=tk.LEFT, padx=5)
         except Exception as e:
@@ -78,6 +325,8 @@ class AVUEchoSpinner(tk.Tk):
         )
         version_label.pack(side=tk.LEFT, padx=5)
 
+    def _build_converter(self):
+        """Build the CHF -> EUR converter section"""
         # ============ WORD CONVERTER SECTION ============
         converter_frame = tk.LabelFrame(
             self,
@@ -89,23 +338,21 @@ class AVUEchoSpinner(tk.Tk):
             bd=3
         )
         converter_frame.pack(fill=tk.X, padx=10, pady=5)
+        converter_frame.grid_columnconfigure(1, weight=1)  # Entry column takes the spare width
 
-        # Word file input
-        word_input_frame = tk.Frame(converter_frame, bg="#1a1a1a")
-        word_input_frame.pack(fill=tk.X, padx=10, pady=5)
-
+        # Word file input (row 0, gridded straight onto the section frame)
         tk.Label(
-            word_input_frame,
+            converter_frame,
             text="Document to Convert:",
             font=("Arial", 10),
             fg="#ffffff",
             bg="#1a1a1a",
             width=18,
             anchor="w"
-        ).pack(side=tk.LEFT)
+        ).grid(row=0, column=0, padx=(10, 0), pady=5, sticky="w")
 
         word_entry = tk.Entry(
-            word_input_frame,
+            converter_frame,
             textvariable=self.word_file_path,
             font=("Consolas", 9),
             bg="#2d2d2d",
@@ -114,10 +361,10 @@ class AVUEchoSpinner(tk.Tk):
             relief=tk.FLAT,
             bd=2
         )
-        word_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        word_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         browse_btn = tk.Button(
-            word_input_frame,
+            converter_frame,
             text="📁 Browse",
             command=self.browse_word_file,
             font=("Arial", 9),
@@ -129,11 +376,11 @@ class AVUEchoSpinner(tk.Tk):
             bd=2,
             cursor="hand2"
         )
-        browse_btn.pack(side=tk.LEFT, padx=2)
+        browse_btn.grid(row=0, column=2, padx=(2, 10), pady=5)
 
         # Direct paragraph input (above SPIN button)
         direct_para_frame = tk.Frame(converter_frame, bg="#1a1a1a")
-        direct_para_frame.pack(fill=tk.BOTH, padx=10, pady=5)
+        direct_para_frame.grid(row=1, column=0, columnspan=3, padx=10, pady=5, sticky="nsew")
 
         # Create a frame for label and checkbox on same line
         para_label_frame = tk.Frame(direct_para_frame, bg="#1a1a1a")
@@ -197,8 +444,11 @@ class AVUEchoSpinner(tk.Tk):
             cursor="hand2",
             height=2
         )
-        spin_btn.pack(pady=10, padx=20, fill=tk.X)
+        spin_btn.grid(row=2, column=0, columnspan=3, pady=10, padx=20, sticky="ew")
+        self.job_buttons.append(spin_btn)
 
+    def _build_matcher(self):
+        """Build the wine matcher section and load the learning database into it"""
         # ============ WINE MATCHER SECTION ============
         matcher_frame = tk.LabelFrame(
             self,
@@ -209,24 +459,23 @@ class AVUEchoSpinner(tk.Tk):
             relief=tk.RIDGE,
             bd=3
         )
-        matcher_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-        # Wine list file input (original single-line)
-        wine_input_frame = tk.Frame(matcher_frame, bg="#1a1a1a")
-        wine_input_frame.pack(fill=tk.X, padx=10, pady=5)
+        matcher_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5, before=self.status_frame)
+        matcher_frame.grid_columnconfigure(1, weight=1)  # Entry column takes the spare width
+        matcher_frame.grid_rowconfigure(5, weight=1)  # Results pane takes the spare height
 
+        # Wine list file input (row 0, gridded straight onto the section frame)
         tk.Label(
-            wine_input_frame,
+            matcher_frame,
             text="Wine List File:",
             font=("Arial", 10),
             fg="#ffffff",
             bg="#1a1a1a",
             width=15,
             anchor="w"
-        ).pack(side=tk.LEFT)
+        ).grid(row=0, column=0, padx=(10, 0), pady=5, sticky="w")
 
         wine_entry = tk.Entry(
-            wine_input_frame,
+            matcher_frame,
             textvariable=self.wine_list_path,
             font=("Consolas", 9),
             bg="#2d2d2d",
@@ -235,10 +484,10 @@ class AVUEchoSpinner(tk.Tk):
             relief=tk.FLAT,
             bd=2
         )
-        wine_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        wine_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         browse_wine_btn = tk.Button(
-            wine_input_frame,
+            matcher_frame,
             text="📁 Browse",
             command=self.browse_wine_list,
             font=("Arial", 9),
@@ -250,10 +499,10 @@ class AVUEchoSpinner(tk.Tk):
             bd=2,
             cursor="hand2"
         )
-        browse_wine_btn.pack(side=tk.LEFT, padx=2)
+        browse_wine_btn.grid(row=0, column=2, padx=2, pady=5)
 
         edit_wine_btn = tk.Button(
-            wine_input_frame,
+            matcher_frame,
             text="✏️ Edit",
             command=self.edit_wine_list,
             font=("Arial", 9),
@@ -265,11 +514,11 @@ class AVUEchoSpinner(tk.Tk):
             bd=2,
             cursor="hand2"
         )
-        edit_wine_btn.pack(side=tk.LEFT, padx=2)
+        edit_wine_btn.grid(row=0, column=3, padx=(2, 10), pady=5)
 
         # Direct wine input (multi-line text area)
         direct_input_frame = tk.Frame(matcher_frame, bg="#1a1a1a")
-        direct_input_frame.pack(fill=tk.BOTH, padx=10, pady=5)
+        direct_input_frame.grid(row=1, column=0, columnspan=4, padx=10, pady=5, sticky="nsew")
 
         tk.Label(
             direct_input_frame,
@@ -301,7 +550,7 @@ class AVUEchoSpinner(tk.Tk):
 
         # Size filter
         size_frame = tk.Frame(matcher_frame, bg="#1a1a1a")
-        size_frame.pack(fill=tk.X, padx=10, pady=5)
+        size_frame.grid(row=2, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
 
         tk.Label(
             size_frame,
@@ -334,7 +583,7 @@ class AVUEchoSpinner(tk.Tk):
 
         # Control buttons
         control_frame = tk.Frame(matcher_frame, bg="#1a1a1a")
-        control_frame.pack(fill=tk.X, padx=10, pady=5)
+        control_frame.grid(row=3, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
 
         match_btn = tk.Button(
             control_frame,
@@ -351,6 +600,7 @@ class AVUEchoSpinner(tk.Tk):
             width=20
         )
         match_btn.pack(side=tk.LEFT, padx=5)
+        self.job_buttons.append(match_btn)
 
         correct_btn = tk.Button(
             control_frame,
@@ -367,11 +617,12 @@ class AVUEchoSpinner(tk.Tk):
             width=20
         )
         correct_btn.pack(side=tk.LEFT, padx=5)
+        self.job_buttons.append(correct_btn)
 
         refresh_btn = tk.Button(
             control_frame,
             text="🔄 Refresh DB",
-            command=self.refresh_learning_db,
+            command=self.schedule_refresh,
             font=("Arial", 10),
             bg="#3d3d3d",
             fg="#ffffff",
@@ -409,7 +660,7 @@ class AVUEchoSpinner(tk.Tk):
             bg="#1a1a1a",
             anchor="w"
         )
-        results_label.pack(fill=tk.X, padx=10, pady=(10, 2))
+        results_label.grid(row=4, column=0, columnspan=4, padx=10, pady=(10, 2), sticky="ew")
 
         # Scrolled text for results
         self.results_text = scrolledtext.ScrolledText(
@@ -421,10 +672,26 @@ class AVUEchoSpinner(tk.Tk):
             relief=tk.SUNKEN,
             bd=2,
             wrap=tk.WORD,
-            height=15
+            height=15,
+            undo=False,
+            maxundo=0
         )
-        self.results_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.results_text.grid(row=5, column=0, columnspan=4, padx=10, pady=5, sticky="nsew")
+
+        # Configure text tags for colors
+        self.results_text.tag_config("header", foreground="#ffff00", font=("Consolas", 9, "bold"))
+        self.results_text.tag_config("success", foreground="#00ff00")
+        self.results_text.tag_config("error", foreground="#ff6666")
+        self.results_text.tag_config("info", foreground="#00ccff")
 
+        # Scrollbar callback, detached while the learning DB view is rewritten
+        self.results_yscroll = self.results_text.cget('yscrollcommand')
+
+        # Load initial learning database
+        self.refresh_learning_db()
+
+    def _build_corrections(self):
+        """Build the interactive corrections panel (packed by show_corrections_panel)"""
         # ============ CORRECTIONS PANEL (INTERACTIVE) ============
         self.corrections_frame = tk.LabelFrame(
             self,
@@ -448,21 +715,41 @@ class AVUEchoSpinner(tk.Tk):
         )
         corrections_info.pack(fill=tk.X, padx=10, pady=5)
 
-        # Scrollable frame for corrections table
-        corrections_canvas = tk.Canvas(self.corrections_frame, bg="#1a1a1a", height=200)
-        corrections_scrollbar = ttk.Scrollbar(self.corrections_frame, orient="vertical", command=corrections_canvas.yview)
-        self.corrections_table_frame = tk.Frame(corrections_canvas, bg="#1a1a1a")
-
-        self.corrections_table_frame.bind(
-            "<Configure>",
-            lambda e: corrections_canvas.configure(scrollregion=corrections_canvas.bbox("all"))
+        # Corrections table: one Treeview, with a single shared Entry placed over the cell being edited
+        style = ttk.Style(self)
+        style.configure("Corrections.Treeview", background="#1a1a1a", fieldbackground="#1a1a1a",
+                        foreground="#ffffff", font=("Arial", 9), rowheight=22)
+        style.configure("Corrections.Treeview.Heading", font=("Arial", 9, "bold"))
+
+        table_frame = tk.Frame(self.corrections_frame, bg="#1a1a1a")
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self.corrections_tree = ttk.Treeview(
+            table_frame,
+            columns=CORRECTION_TABLE_COLUMNS,
+            show="headings",
+            height=8,
+            style="Corrections.Treeview"
         )
+        for column, heading, width in zip(CORRECTION_TABLE_COLUMNS, CORRECTION_TABLE_HEADINGS, CORRECTION_TABLE_WIDTHS):
+            self.corrections_tree.heading(column, text=heading, anchor="w")
+            self.corrections_tree.column(column, width=width, anchor="w", stretch=column in ("wine", "reason"))
 
-        corrections_canvas.create_window((0, 0), window=self.corrections_table_frame, anchor="nw")
-        corrections_canvas.configure(yscrollcommand=corrections_scrollbar.set)
+        self.corrections_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.corrections_tree.yview)
+        self.corrections_tree.configure(yscrollcommand=self.on_corrections_scroll)
 
-        corrections_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-        corrections_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.corrections_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.corrections_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.correction_editor = tk.Entry(
+            self.corrections_tree, font=("Arial", 10), bg="#2d2d2d", fg="#00ff00", insertbackground="#00ff00"
+        )
+        self.correction_editor_row = None
+        self._editor_yview = None
+        self.corrections_tree.bind("<Double-1>", self.edit_correction_cell)
+        self.correction_editor.bind("<Return>", self.commit_correction_edit)
+        self.correction_editor.bind("<FocusOut>", self.commit_correction_edit)
+        self.correction_editor.bind("<Escape>", self.cancel_correction_edit)
 
         # Action buttons for corrections
         corrections_btn_frame = tk.Frame(self.corrections_frame, bg="#1a1a1a")
@@ -482,6 +769,7 @@ class AVUEchoSpinner(tk.Tk):
             width=20
         )
         apply_corrections_btn.pack(side=tk.LEFT, padx=5)
+        self.job_buttons.append(apply_corrections_btn)
 
         hide_corrections_btn = tk.Button(
             corrections_btn_frame,
@@ -497,16 +785,15 @@ class AVUEchoSpinner(tk.Tk):
         )
         hide_corrections_btn.pack(side=tk.LEFT, padx=5)
 
-        # Storage for correction entry widgets
-        self.correction_entries = []
-
+    def _build_status(self):
+        """Build the status bar"""
         # ============ STATUS BAR ============
-        status_frame = tk.Frame(self, bg="#2d2d2d", height=25)
-        status_frame.pack(fill=tk.X, padx=2, pady=2)
-        status_frame.pack_propagate(False)
+        self.status_frame = tk.Frame(self, bg="#2d2d2d", height=25)
+        self.status_frame.pack(fill=tk.X, padx=2, pady=2)
+        self.status_frame.pack_propagate(False)
 
         self.status_label = tk.Label(
-            status_frame,
+            self.status_frame,
             text="Ready",
             font=("Arial", 9),
             fg="#00ff00",
@@ -515,15 +802,29 @@ class AVUEchoSpinner(tk.Tk):
         )
         self.status_label.pack(side=tk.LEFT, padx=10)
 
-        # Load initial learning database
-        self.refresh_learning_db()
+        # Asks the running script to stop at its next check (see job_control)
+        self.cancel_button = tk.Button(
+            self.status_frame,
+            text="⛔ Cancel",
+            command=self.cancel_job,
+            font=("Arial", 8),
+            bg="#aa0000",
+            fg="#ffffff",
+            activebackground="#cc0000",
+            activeforeground="#ffffff",
+            relief=tk.RAISED,
+            bd=1,
+            cursor="hand2",
+            state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
 
     def browse_word_file(self):
         """Browse for document to convert"""
         filename = filedialog.askopenfilename(
             title="Select Document to Convert",
             filetypes=[("Text Files", "*.txt"), ("Word Documents", "*.docx"), ("All Files", "*.*")],
-            initialdir=Path(DEFAULT_MULTI_FILE).parent
+            initialdir=DEFAULT_MULTI_DIR
         )
         if filename:
             self.word_file_path.set(filename)
@@ -534,7 +835,7 @@ class AVUEchoSpinner(tk.Tk):
         filename = filedialog.askopenfilename(
             title="Select Wine List",
             filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")],
-            initialdir=Path(DEFAULT_WINE_LIST).parent
+            initialdir=DEFAULT_WINE_LIST_DIR
         )
         if filename:
             self.wine_list_path.set(filename)
@@ -552,162 +853,252 @@ class AVUEchoSpinner(tk.Tk):
         except Exception as e:
             messagebox.showerror("Error", f"Could not open file:\n{e}")
 
+    def call_in_ui(self, func, *args):
+        """Run func(*args) on the UI thread (safe to call from the worker thread)
+
+        Does nothing once the window is closed: a job that is still running
+        must not touch the destroyed Tk root.
+        """
+        if self.closed:
+            return
+        try:
+            self.after(0, func, *args)
+        except (RuntimeError, tk.TclError):
+            pass  # Window was destroyed between the check and the call
+
     def update_status(self, message):
-        """Update status bar"""
-        self.status_label.config(text=message)
-        self.update_idletasks()
+        """Update status bar (safe to call from the worker thread)"""
+        self.call_in_ui(lambda: self.status_label.config(text=message))
+
+    def append_results(self, text):
+        """Append text to the results pane from the worker thread via the UI thread"""
+        self.call_in_ui(self.results_text.insert, tk.END, text)
+
+    def start_job(self, job):
+        """Submit a job to the worker thread, disabling the run buttons until it finishes"""
+        for button in self.job_buttons:
+            button.config(state=tk.DISABLED)
+        CANCEL_EVENT.clear()
+        self.cancel_button.config(state=tk.NORMAL)
+
+        def run():
+            try:
+                job()
+            except JobCancelled:
+                self.append_results("\n\n⛔ Job cancelled\n")
+                self.update_status("⛔ Job cancelled")
+
+        self.active_job = self.executor.submit(run)
+        self.active_job.add_done_callback(lambda _: self.call_in_ui(self.enable_job_buttons))
+
+    def enable_job_buttons(self):
+        """Re-enable the run buttons once the worker is idle"""
+        for button in self.job_buttons:
+            button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def cancel_job(self):
+        """Ask the running job to stop; the buttons come back once it has"""
+        CANCEL_EVENT.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.update_status("⏳ Cancelling...")
+
+    def job_running(self):
+        """True while a job started with start_job has not finished"""
+        return self.active_job is not None and not self.active_job.done()
+
+    def on_close(self):
+        """Drop queued jobs and close the window without waiting for a running job"""
+        self.closed = True
+        CANCEL_EVENT.set()  # Let a running script stop early
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
+    def run_script(self, module_name, argv):
+        """Run a pipeline script's main(argv) in-process, streaming its output to the results pane
+
+        The script module is imported on first use and stays loaded, so later
+        runs skip interpreter startup and the pandas import. Raises JobCancelled
+        if the user cancelled the run.
+        """
+        module = importlib.import_module(module_name)
+        writer = ResultsPaneWriter(self)
+        try:
+            with self.stdout_router.redirect(writer), self.stderr_router.redirect(writer):
+                try:
+                    returncode = module.main(argv)
+                except SystemExit as e:
+                    # Same exit status the interpreter would use: None -> 0, int as-is, anything else (a message) -> 1
+                    if e.code is None:
+                        returncode = 0
+                    elif isinstance(e.code, int):
+                        returncode = e.code
+                    else:
+                        print(e.code)
+                        returncode = 1
+                except Exception:
+                    traceback.print_exc()
+                    returncode = 1
+        finally:
+            writer.flush()  # Also shows what a cancelled run printed
+        return returncode or 0
 
     def run_converter(self):
-        """Run word_converter_improved.py in a separate thread"""
+        """Run the CHF -> EUR conversion on the worker thread"""
         def run():
             try:
                 self.update_status("🔄 Converting CHF to EUR...")
-                self.results_text.delete(1.0, tk.END)
-                self.results_text.insert(tk.END, "Running CHF → EUR Converter...\n\n")
-                self.results_text.update()
+                self.call_in_ui(self.results_text.delete, 1.0, tk.END)
+                self.append_results("Running CHF → EUR Converter...\n\n")
 
                 # Check if user entered text directly
                 direct_input = self.direct_para_text.get("1.0", tk.END).strip()
 
                 if direct_input:
                     # Direct paragraph conversion
-                    self.results_text.insert(tk.END, "Converting paragraph directly...\n\n")
+                    self.append_results("Converting paragraph directly...\n\n")
                     converted_text = self.convert_paragraph_direct(direct_input)
 
                     if converted_text:
                         # Save to output file
                         from datetime import datetime
                         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                        output_file = Path(OUTPUTS_DIR) / f"Converted_Paragraph_{timestamp}.txt"
-
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            f.write("="*80 + "\n")
-                            f.write("DIRECT PARAGRAPH CONVERSION - CHF to EUR\n")
-                            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                            f.write("="*80 + "\n\n")
-                            f.write("ORIGINAL TEXT:\n")
-                            f.write("-"*80 + "\n")
-                            f.write(direct_input + "\n\n")
-                            f.write("CONVERTED TEXT:\n")
-                            f.write("-"*80 + "\n")
-                            f.write(converted_text + "\n")
+                        output_file = OUTPUTS_DIR / f"Converted_Paragraph_{timestamp}.txt"
+
+                        report = "\n".join([
+                            RULE_EQ,
+                            "DIRECT PARAGRAPH CONVERSION - CHF to EUR",
+                            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                            RULE_EQ,
+                            "",
+                            "ORIGINAL TEXT:",
+                            RULE_DASH,
+                            direct_input,
+                            "",
+                            "CONVERTED TEXT:",
+                            RULE_DASH,
+                            converted_text,
+                            "",
+                        ])
+                        output_file.write_text(report, encoding='utf-8')
 
                         # Display result
-                        self.results_text.insert(tk.END, f"✅ Conversion completed!\n\n")
-                        self.results_text.insert(tk.END, f"ORIGINAL:\n{direct_input}\n\n")
-                        self.results_text.insert(tk.END, f"CONVERTED:\n{converted_text}\n\n")
-                        self.results_text.insert(tk.END, f"📁 Saved to: {output_file.name}\n")
+                        self.append_results(
+                            f"✅ Conversion completed!\n\n"
+                            f"ORIGINAL:\n{direct_input}\n\n"
+                            f"CONVERTED:\n{converted_text}\n\n"
+                            f"📁 Saved to: {output_file.name}\n"
+                        )
 
                         self.update_status("✅ Paragraph conversion completed!")
-                        messagebox.showinfo("Success", f"Paragraph converted successfully!\n\nSaved to:\n{output_file}")
+                        self.call_in_ui(messagebox.showinfo, "Success", f"Paragraph converted successfully!\n\nSaved to:\n{output_file}")
                     else:
                         self.update_status("❌ Conversion failed")
-                        messagebox.showerror("Error", "Could not convert paragraph")
+                        self.call_in_ui(messagebox.showerror, "Error", "Could not convert paragraph")
                 else:
                     # Integrated workflow: Match wines then convert
                     # Now using integrated_converter.py instead of txt_converter.py
-                    result = subprocess.run(
-                        [sys.executable, "integrated_converter.py"],
-                        cwd=Path(__file__).parent,
-                        capture_output=True,
-                        text=True,
-                        encoding='utf-8',
-                        errors='replace',
-                        timeout=300  # Increased timeout for full workflow
-                    )
-
-                    output = result.stdout + result.stderr
-                    self.results_text.insert(tk.END, output)
+                    returncode = self.run_script("integrated_converter", [])
 
-                    if result.returncode == 0:
+                    if returncode == 0:
                         self.update_status("✅ Conversion completed successfully!")
-                        messagebox.showinfo("Success", "Wine recognition and conversion completed!\n\nCheck:\n- Outputs/Multi_converted_XXX.txt\n- Outputs/Stock_Lines_Filtered_XXX.xlsx\n- Outputs/Detailed match results/Recognition_Report_XXX.txt")
+                        self.call_in_ui(messagebox.showinfo, "Success", "Wine recognition and conversion completed!\n\nCheck:\n- Outputs/Multi_converted_XXX.txt\n- Outputs/Stock_Lines_Filtered_XXX.xlsx\n- Outputs/Detailed match results/Recognition_Report_XXX.txt")
 
                         # Check for corrections file and show panel if needed
-                        self.check_for_corrections_file()
+                        self.call_in_ui(self.check_for_corrections_file)
                     else:
                         self.update_status("❌ Conversion failed")
-                        messagebox.showerror("Error", f"Conversion failed with return code {result.returncode}")
+                        self.call_in_ui(messagebox.showerror, "Error", f"Conversion failed with return code {returncode}")
 
                         # Even if conversion failed, check for corrections that might have been generated
-                        self.check_for_corrections_file()
+                        self.call_in_ui(self.check_for_corrections_file)
 
-            except subprocess.TimeoutExpired:
-                self.update_status("⏱️ Conversion timeout")
-                self.results_text.insert(tk.END, "\n\n⚠️ Process timed out after 2 minutes")
-                messagebox.showwarning("Timeout", "Conversion took too long and was terminated")
             except Exception as e:
                 self.update_status(f"❌ Error: {str(e)}")
-                self.results_text.insert(tk.END, f"\n\n❌ ERROR: {e}")
-                messagebox.showerror("Error", f"An error occurred:\n{e}")
+                self.append_results(f"\n\n❌ ERROR: {e}")
+                self.call_in_ui(messagebox.showerror, "Error", f"An error occurred:\n{e}")
 
-        # Run in thread to avoid freezing UI
-        thread = threading.Thread(target=run, daemon=True)
-        thread.start()
+        # Run on the worker thread to avoid freezing UI
+        self.start_job(run)
 
-    def convert_paragraph_direct(self, text):
-        """Convert a paragraph of text from CHF to EUR using a simplified approach"""
-        try:
-            import pandas as pd
-            import re
+    def get_conversion_map(self):
+        """Return the CHF -> EUR map, re-reading the OMT list only when the file has changed"""
+        mtime = os.path.getmtime(OMT_EXCEL_FILE)
+        if self._conversion_map is not None and mtime == self._conversion_map_mtime:
+            return self._conversion_map
 
-            # Load the Excel database
-            excel_file = rf"{DATABASE_DIR}\OMT Main Offer List.xlsx"
-            df = pd.read_excel(excel_file)
+        import openpyxl
 
-            # Create conversion map (CHF -> EUR)
-            df['CHF_KEY'] = df['Unit Price'].astype(float).round(2).apply(lambda x: f'{x:.2f}')
-            df['EUR_VALUE'] = df['Unit Price (EUR)'].astype(float).round(0).apply(lambda x: f'{int(x)}.00')
+        # Walk only the two price columns of the first sheet (same sheet pd.read_excel would load)
+        wb = openpyxl.load_workbook(OMT_EXCEL_FILE, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows)
+            chf_col = header.index('Unit Price')
+            eur_col = header.index('Unit Price (EUR)')
 
+            # Create conversion map (CHF cents -> EUR); first row wins when several wines share a CHF price
             conversion_map = {}
-            for _, row in df.iterrows():
-                chf = row['CHF_KEY']
-                eur = row['EUR_VALUE']
-                if chf not in conversion_map:
-                    conversion_map[chf] = eur
+            for row in rows:
+                chf, eur = row[chf_col], row[eur_col]
+                if chf is None or eur is None:
+                    continue
+                conversion_map.setdefault(int(round(float(chf) * 100)), f'{int(round(float(eur)))}.00')
+        finally:
+            wb.close()
+
+        self._conversion_map = conversion_map
+        self._conversion_map_mtime = mtime
+        self._conversion_cents = sorted(conversion_map)
+        return conversion_map
+
+    def nearest_conversion(self, cents):
+        """Return the EUR price of the closest known CHF price within PRICE_TOLERANCE_CENTS, or None"""
+        keys = self._conversion_cents
+        i = bisect.bisect_left(keys, cents)
+        candidates = [keys[j] for j in (i - 1, i) if 0 <= j < len(keys)]
+        if not candidates:
+            return None
+        nearest = min(candidates, key=lambda key: abs(key - cents))
+        if abs(nearest - cents) > PRICE_TOLERANCE_CENTS:
+            return None
+        return self._conversion_map[nearest]
 
-            # Find and replace CHF prices
-            converted = text
+    def convert_paragraph_direct(self, text):
+        """Convert a paragraph of text from CHF to EUR using a simplified approach"""
+        try:
+            conversion_map = self.get_conversion_map()
 
-            # Pattern 1: "CHF XX.XX"
-            for match in re.finditer(r'[Cc][Hh][Ff]\s+(\d+(?:[\']\d{3})*\.?\d{0,2})', converted):
-                chf_str = match.group(1).replace("'", "")
-                if '.' not in chf_str:
-                    chf_str += '.00'
-                elif len(chf_str.split('.')[1]) == 1:
-                    chf_str += '0'
+            # Prices repeat a lot in pasted offers; convert each distinct one once
+            @functools.lru_cache(maxsize=None)
+            def to_eur(chf_str):
+                chf = float(chf_str.translate(STRIP_THOUSANDS_SEP))
+                cents = int(round(chf * 100))
+                eur = conversion_map.get(cents) or self.nearest_conversion(cents)
+                return eur or f"{int(chf * 1.08)}.00"
 
-                eur_value = conversion_map.get(chf_str, f"{int(float(chf_str) * 1.08)}.00")
-                converted = converted.replace(match.group(0), f'EUR {eur_value}')
+            # Pattern 1: "CHF XX.XX"
+            converted = CHF_PREFIX_RE.sub(lambda m: f'EUR {to_eur(m.group(1))}', text)
 
             # Pattern 2: "XX.XX CHF"
-            for match in re.finditer(r'(\d+(?:[\']\d{3})*\.?\d{0,2})\s+[Cc][Hh][Ff]', converted):
-                chf_str = match.group(1).replace("'", "")
-                if '.' not in chf_str:
-                    chf_str += '.00'
-                elif len(chf_str.split('.')[1]) == 1:
-                    chf_str += '0'
-
-                eur_value = conversion_map.get(chf_str, f"{int(float(chf_str) * 1.08)}.00")
-                converted = converted.replace(match.group(0), f'{eur_value} EUR')
+            converted = CHF_SUFFIX_RE.sub(lambda m: f'{to_eur(m.group(1))} EUR', converted)
 
             # Replace any remaining CHF with EUR
-            converted = re.sub(r'\b[Cc][Hh][Ff]\b', 'EUR', converted)
+            converted = CHF_WORD_RE.sub('EUR', converted)
 
             return converted
 
         except Exception as e:
-            self.results_text.insert(tk.END, f"\n❌ Error during conversion: {e}\n")
+            self.append_results(f"\n❌ Error during conversion: {e}\n")
             return None
 
     def run_matcher(self):
-        """Run wine_item_matcher.py in a separate thread"""
+        """Run wine_item_matcher.py on the worker thread"""
         def run():
             try:
                 self.update_status("🔍 Matching wine names to Item Numbers...")
-                self.results_text.delete(1.0, tk.END)
-                self.results_text.insert(tk.END, "Running Wine Item Matcher...\n\n")
-                self.results_text.update()
+                self.call_in_ui(self.results_text.delete, 1.0, tk.END)
+                self.append_results("Running Wine Item Matcher...\n\n")
 
                 # Check if user entered wines directly
                 direct_input = self.direct_wine_text.get("1.0", tk.END).strip()
@@ -715,184 +1106,156 @@ class AVUEchoSpinner(tk.Tk):
                 # Get size filter
                 size_filter = self.size_filter.get()
 
-                # Prepare command
-                cmd = [sys.executable, "wine_item_matcher.py"]
+                # Prepare arguments
+                args = []
 
                 # Add size parameter
                 if size_filter != "All sizes":
-                    cmd.extend(["--size", size_filter])
+                    args.extend(["--size", size_filter])
 
                 # If direct input provided, create temporary file
                 temp_input_file = None
                 if direct_input:
-                    self.results_text.insert(tk.END, f"Using direct input with {len(direct_input.splitlines())} wines\n")
-                    self.results_text.insert(tk.END, f"Size filter: {size_filter}\n\n")
+                    self.append_results(
+                        f"Using direct input with {len(direct_input.splitlines())} wines\n"
+                        f"Size filter: {size_filter}\n\n"
+                    )
 
                     # Create temporary input file
-                    import tempfile
-                    temp_input_file = Path(tempfile.gettempdir()) / "avu_temp_wine_input.txt"
+                    temp_input_file = TEMP_WINE_INPUT
                     with open(temp_input_file, 'w', encoding='utf-8') as f:
                         f.write(direct_input)
 
-                    cmd.extend(["--input", str(temp_input_file)])
+                    args.extend(["--input", str(temp_input_file)])
                 else:
                     # Use file path
                     wine_file = self.wine_list_path.get()
                     if wine_file:
-                        cmd.extend(["--input", wine_file])
-                    self.results_text.insert(tk.END, f"Using wine list file: {Path(wine_file).name}\n")
-                    self.results_text.insert(tk.END, f"Size filter: {size_filter}\n\n")
-
-                # Run the matcher with explicit UTF-8 encoding
-                result = subprocess.run(
-                    cmd,
-                    cwd=Path(__file__).parent,
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',
-                    timeout=60
-                )
+                        args.extend(["--input", wine_file])
+                    self.append_results(
+                        f"Using wine list file: {Path(wine_file).name}\n"
+                        f"Size filter: {size_filter}\n\n"
+                    )
+
+                # Run the matcher
+                returncode = self.run_script("wine_item_matcher", args)
 
                 # Clean up temp file
                 if temp_input_file and temp_input_file.exists():
                     temp_input_file.unlink()
 
-                output = result.stdout + result.stderr
-                self.results_text.insert(tk.END, output)
-
-                if result.returncode == 0:
+                if returncode == 0:
                     self.update_status("✅ Wine matching completed!")
                     # Refresh learning database display
-                    self.after(100, self.refresh_learning_db)
-                    messagebox.showinfo("Success", "Wine matching completed!\n\nCheck results in ItemNo_Results_[timestamp].txt")
+                    self.call_in_ui(self.schedule_refresh)
+                    self.call_in_ui(messagebox.showinfo, "Success", "Wine matching completed!\n\nCheck results in ItemNo_Results_[timestamp].txt")
                 else:
                     self.update_status("❌ Matching failed")
-                    messagebox.showerror("Error", f"Matching failed with return code {result.returncode}")
+                    self.call_in_ui(messagebox.showerror, "Error", f"Matching failed with return code {returncode}")
 
-            except subprocess.TimeoutExpired:
-                self.update_status("⏱️ Matching timeout")
-                self.results_text.insert(tk.END, "\n\n⚠️ Process timed out after 1 minute")
-                messagebox.showwarning("Timeout", "Matching took too long and was terminated")
             except Exception as e:
                 self.update_status(f"❌ Error: {str(e)}")
-                self.results_text.insert(tk.END, f"\n\n❌ ERROR: {e}")
-                messagebox.showerror("Error", f"An error occurred:\n{e}")
+                self.append_results(f"\n\n❌ ERROR: {e}")
+                self.call_in_ui(messagebox.showerror, "Error", f"An error occurred:\n{e}")
 
-        thread = threading.Thread(target=run, daemon=True)
-        thread.start()
+        self.start_job(run)
 
     def apply_corrections(self):
-        """Run apply_corrections.py in a separate thread"""
+        """Run apply_corrections.py on the worker thread"""
         def run():
             try:
                 self.update_status("✔️ Applying corrections to learning database...")
-                self.results_text.delete(1.0, tk.END)
-                self.results_text.insert(tk.END, "Applying Corrections...\n\n")
-                self.results_text.update()
-
-                # Run apply corrections with explicit UTF-8 encoding
-                result = subprocess.run(
-                    [sys.executable, "apply_corrections.py"],
-                    cwd=Path(__file__).parent,
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',
-                    timeout=30
-                )
-
-                output = result.stdout + result.stderr
-                self.results_text.insert(tk.END, output)
-
-                if result.returncode == 0:
+                self.call_in_ui(self.results_text.delete, 1.0, tk.END)
+                self.append_results("Applying Corrections...\n\n")
+
+                # Run apply corrections on the latest corrections file
+                returncode = self.run_script("apply_corrections", [])
+
+                if returncode == 0:
                     self.update_status("✅ Corrections applied successfully!")
                     # Refresh learning database display
-                    self.after(100, self.refresh_learning_db)
-                    messagebox.showinfo("Success", "Corrections applied to learning database!")
+                    self.call_in_ui(self.schedule_refresh)
+                    self.call_in_ui(messagebox.showinfo, "Success", "Corrections applied to learning database!")
                 else:
                     self.update_status("❌ Apply corrections failed")
-                    messagebox.showerror("Error", f"Apply corrections failed with return code {result.returncode}")
+                    self.call_in_ui(messagebox.showerror, "Error", f"Apply corrections failed with return code {returncode}")
 
-            except subprocess.TimeoutExpired:
-                self.update_status("⏱️ Apply corrections timeout")
-                self.results_text.insert(tk.END, "\n\n⚠️ Process timed out after 30 seconds")
             except Exception as e:
                 self.update_status(f"❌ Error: {str(e)}")
-                self.results_text.insert(tk.END, f"\n\n❌ ERROR: {e}")
-                messagebox.showerror("Error", f"An error occurred:\n{e}")
+                self.append_results(f"\n\n❌ ERROR: {e}")
+                self.call_in_ui(messagebox.showerror, "Error", f"An error occurred:\n{e}")
+
+        self.start_job(run)
 
-        thread = threading.Thread(target=run, daemon=True)
-        thread.start()
+    def schedule_refresh(self, delay=LEARNING_DB_REFRESH_DELAY_MS):
+        """Refresh the learning DB view after a short delay, collapsing bursts of requests into one reload"""
+        if self._refresh_pending is not None:
+            self.after_cancel(self._refresh_pending)
+        self._refresh_pending = self.after(delay, self._run_scheduled_refresh)
+
+    def _run_scheduled_refresh(self):
+        self._refresh_pending = None
+        self.refresh_learning_db()
 
     def refresh_learning_db(self):
-        """Load and display learning database contents"""
+        """Reload the learning database view; the file is read on the worker thread"""
+        self.executor.submit(self.load_learning_db)
+
+    def load_learning_db(self):
+        """Read the learning database and build its view (runs on the worker thread)"""
         try:
-            self.results_text.delete(1.0, tk.END)
+            # Only lines appended since the last refresh are parsed
+            latest_entries, valid_count, not_found_count = self.learning_db_tail.read()
+
+            # Build the whole view as (text, tags) pairs so it can be inserted in one call
+            segments = [
+                RULE_EQ + "\n", (),
+                "LEARNING DATABASE - WINE → ITEM NUMBER MAPPINGS\n", "header",
+                RULE_EQ + "\n\n📊 Statistics:\n", (),
+                f"  • Total Valid Mappings: {valid_count}\n", "success",
+                f"  • NOT FOUND Entries: {not_found_count}\n", "error",
+                "\n" + RULE_DASH + "\n\n", (),
+            ]
 
-            if not Path(LEARNING_DB).exists():
-                self.results_text.insert(tk.END, "⚠️ Learning database not found\n")
-                self.update_status("Learning database not found")
-                return
-
-            with open(LEARNING_DB, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            # Count entries
-            valid_entries = []
-            not_found_count = 0
-
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    parts = line.split(' | ')
-                    if len(parts) >= 3:
-                        wine_name = parts[0]
-                        vintage = parts[1]
-                        item_no = parts[2].split()[0]  # Get just the item number
-
-                        if item_no == 'NOT_FOUND':
-                            not_found_count += 1
-                        else:
-                            valid_entries.append((wine_name, vintage, item_no))
+            # Display entries in a formatted table (latest first)
+            if valid_count:
+                rows = [RULE_DASH + "\n"]
 
-            # Display header
-            self.results_text.insert(tk.END, "="*80 + "\n")
-            self.results_text.insert(tk.END, "LEARNING DATABASE - WINE → ITEM NUMBER MAPPINGS\n", "header")
-            self.results_text.insert(tk.END, "="*80 + "\n\n")
+                # Show the latest entries in reverse order (latest first)
+                for wine, vintage, item in reversed(latest_entries):
+                    wine_short = truncate(wine, 40, 38, "..")
+                    rows.append(wine_short.ljust(40) + ' ' + vintage.ljust(10) + ' ' + item.ljust(10) + '\n')
 
-            self.results_text.insert(tk.END, f"📊 Statistics:\n")
-            self.results_text.insert(tk.END, f"  • Total Valid Mappings: {len(valid_entries)}\n", "success")
-            self.results_text.insert(tk.END, f"  • NOT FOUND Entries: {not_found_count}\n", "error")
-            self.results_text.insert(tk.END, "\n" + "-"*80 + "\n\n")
+                segments += [f"{'Wine Name':<40} {'Vintage':<10} {'Item No.':<10}\n", "header", ''.join(rows), ()]
 
-            # Display entries in a formatted table (latest first)
-            if valid_entries:
-                self.results_text.insert(tk.END, f"{'Wine Name':<40} {'Vintage':<10} {'Item No.':<10}\n", "header")
-                self.results_text.insert(tk.END, "-"*80 + "\n")
-
-                # Show last 50 entries in reverse order (latest first)
-                display_entries = valid_entries[-50:][::-1]
-                for wine, vintage, item in display_entries:
-                    wine_short = wine[:38] + ".." if len(wine) > 40 else wine
-                    self.results_text.insert(tk.END, f"{wine_short:<40} {vintage:<10} {item:<10}\n")
-
-                if len(valid_entries) > 50:
-                    self.results_text.insert(tk.END, f"\n... showing latest 50 of {len(valid_entries)} entries\n", "info")
+                if valid_count > LEARNING_DB_DISPLAY_LIMIT:
+                    segments += [f"\n... showing latest {LEARNING_DB_DISPLAY_LIMIT} of {valid_count} entries\n", "info"]
             else:
-                self.results_text.insert(tk.END, "No valid entries found in learning database\n", "error")
-
-            # Configure text tags for colors
-            self.results_text.tag_config("header", foreground="#ffff00", font=("Consolas", 9, "bold"))
-            self.results_text.tag_config("success", foreground="#00ff00")
-            self.results_text.tag_config("error", foreground="#ff6666")
-            self.results_text.tag_config("info", foreground="#00ccff")
+                segments += ["No valid entries found in learning database\n", "error"]
 
-            self.update_status(f"✅ Learning DB loaded: {len(valid_entries)} valid mappings")
+            status = f"✅ Learning DB loaded: {valid_count} valid mappings"
 
+        except FileNotFoundError:
+            segments = ["⚠️ Learning database not found\n", ()]
+            status = "Learning database not found"
         except Exception as e:
-            self.results_text.insert(tk.END, f"❌ Error loading learning database:\n{e}\n")
-            self.update_status(f"❌ Error loading DB: {str(e)}")
+            segments = [f"❌ Error loading learning database:\n{e}\n", ()]
+            status = f"❌ Error loading DB: {str(e)}"
+
+        self.call_in_ui(self.show_learning_db, segments, status)
+
+    def show_learning_db(self, segments, status):
+        """Replace the results pane with a prepared learning database view"""
+        # Detach the scrollbar while the pane is rewritten, then reattach and jump to the top
+        self.results_text.configure(yscrollcommand='')
+        try:
+            self.results_text.delete(1.0, tk.END)
+            self.results_text.insert(tk.END, *segments)
+        finally:
+            self.results_text.configure(yscrollcommand=self.results_yscroll)
+        self.results_text.yview_moveto(0)
+
+        self.update_status(status)
 
     def load_corrections_file(self, corrections_file_path):
         """Parse CORRECTIONS_NEEDED file and populate interactive corrections table"""
@@ -901,35 +1264,27 @@ class AVUEchoSpinner(tk.Tk):
             current_entry = {}
 
             with open(corrections_file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            for line in lines:
-                line_stripped = line.strip()
-
-                if not line_stripped or line_stripped.startswith('='):
-                    continue
-
-                # Parse entry fields
-                if line_stripped.startswith('Name:'):
-                    current_entry['wine_name'] = line_stripped.replace('Name:', '').strip()
-                elif line_stripped.startswith('Vintage:') and 'wine_name' in current_entry:
-                    current_entry['vintage'] = line_stripped.replace('Vintage:', '').strip()
-                elif line_stripped.startswith('CHF Price:'):
-                    current_entry['chf_price'] = line_stripped.replace('CHF Price:', '').strip()
-                elif 'MATCHED TO DATABASE:' in line:
-                    # Next section starts
-                    pass
-                elif line_stripped.startswith('Wine:') and 'chf_price' in current_entry:
-                    current_entry['matched_wine'] = line_stripped.replace('Wine:', '').strip()
-                elif line_stripped.startswith('Item No.:'):
-                    current_entry['item_no'] = line_stripped.replace('Item No.:', '').strip()
-                elif line_stripped.startswith('REASON:'):
-                    current_entry['reason'] = line_stripped.replace('REASON:', '').strip()
-
-                    # Entry complete
-                    if current_entry.get('wine_name') and current_entry.get('vintage'):
-                        corrections.append(current_entry.copy())
-                    current_entry = {}
+                for line in f:
+                    label, sep, value = line.strip().partition(':')
+                    if not sep:
+                        continue
+
+                    # Parse entry fields
+                    field = CORRECTION_FIELDS.get(label)
+                    if field is None:
+                        continue
+                    if field == 'vintage' and 'wine_name' not in current_entry:
+                        continue
+                    if field == 'matched_wine' and 'chf_price' not in current_entry:
+                        continue
+
+                    current_entry[field] = value.strip()
+
+                    if field == 'reason':
+                        # Entry complete
+                        if current_entry.get('wine_name') and current_entry.get('vintage'):
+                            corrections.append(current_entry)
+                        current_entry = {}
 
             return corrections
 
@@ -945,59 +1300,82 @@ class AVUEchoSpinner(tk.Tk):
             messagebox.showinfo("No Corrections", "No wines found needing correction.")
             return
 
+        if self.corrections_frame is None:
+            self._build_corrections()
+
         # Clear existing table
-        for widget in self.corrections_table_frame.winfo_children():
-            widget.destroy()
+        self.cancel_correction_edit()
+        self.corrections_tree.delete(*self.corrections_tree.get_children())
         self.correction_entries.clear()
 
-        # Create header
-        header_frame = tk.Frame(self.corrections_table_frame, bg="#2d2d2d", relief=tk.RAISED, bd=2)
-        header_frame.pack(fill=tk.X, padx=5, pady=5)
-
-        tk.Label(header_frame, text="Wine Name", font=("Arial", 9, "bold"), fg="#ffff00", bg="#2d2d2d", width=25, anchor="w").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        tk.Label(header_frame, text="Vintage", font=("Arial", 9, "bold"), fg="#ffff00", bg="#2d2d2d", width=8).grid(row=0, column=1, padx=5, pady=5)
-        tk.Label(header_frame, text="Price", font=("Arial", 9, "bold"), fg="#ffff00", bg="#2d2d2d", width=8).grid(row=0, column=2, padx=5, pady=5)
-        tk.Label(header_frame, text="Suggested Item No.", font=("Arial", 9, "bold"), fg="#ffff00", bg="#2d2d2d", width=15).grid(row=0, column=3, padx=5, pady=5)
-        tk.Label(header_frame, text="Correct Item No.", font=("Arial", 9, "bold"), fg="#00ff00", bg="#2d2d2d", width=15).grid(row=0, column=4, padx=5, pady=5)
-        tk.Label(header_frame, text="Reason", font=("Arial", 9, "bold"), fg="#ffff00", bg="#2d2d2d", width=25, anchor="w").grid(row=0, column=5, padx=5, pady=5, sticky="w")
-
         # Create rows for each correction
-        for idx, corr in enumerate(corrections):
-            row_frame = tk.Frame(self.corrections_table_frame, bg="#1a1a1a", relief=tk.GROOVE, bd=1)
-            row_frame.pack(fill=tk.X, padx=5, pady=2)
-
-            wine_short = corr['wine_name'][:22] + "..." if len(corr['wine_name']) > 25 else corr['wine_name']
-            reason_short = corr.get('reason', 'N/A')[:22] + "..." if len(corr.get('reason', '')) > 25 else corr.get('reason', 'N/A')
-
-            tk.Label(row_frame, text=wine_short, font=("Arial", 9), fg="#ffffff", bg="#1a1a1a", width=25, anchor="w").grid(row=0, column=0, padx=5, pady=3, sticky="w")
-            tk.Label(row_frame, text=corr['vintage'], font=("Arial", 9), fg="#ffffff", bg="#1a1a1a", width=8).grid(row=0, column=1, padx=5, pady=3)
-            tk.Label(row_frame, text=corr['chf_price'], font=("Arial", 9), fg="#ffffff", bg="#1a1a1a", width=8).grid(row=0, column=2, padx=5, pady=3)
-            tk.Label(row_frame, text=corr.get('item_no', 'N/A'), font=("Arial", 9), fg="#ff9900", bg="#1a1a1a", width=15).grid(row=0, column=3, padx=5, pady=3)
-
-            # Entry for user to input correct Item No.
-            item_entry = tk.Entry(row_frame, font=("Arial", 10), bg="#2d2d2d", fg="#00ff00", insertbackground="#00ff00", width=15)
-            item_entry.grid(row=0, column=4, padx=5, pady=3)
+        for corr in corrections:
+            wine_short = truncate(corr['wine_name'], 25, 22, "...")
+            reason_short = truncate(corr.get('reason', 'N/A'), 25, 22, "...")
 
-            # Pre-fill with suggested Item No if it's not MANUAL_ENTRY_NEEDED
-            if corr.get('item_no') and corr['item_no'] not in ['MANUAL_ENTRY_NEEDED', 'NOT_FOUND']:
-                item_entry.insert(0, corr['item_no'])
+            # Pre-fill the correct Item No. with the suggestion if it's not MANUAL_ENTRY_NEEDED
+            suggested = corr.get('item_no', 'N/A')
+            correct = suggested if corr.get('item_no') and suggested not in PLACEHOLDER_ITEM_NOS else ''
 
-            tk.Label(row_frame, text=reason_short, font=("Arial", 8), fg="#cccccc", bg="#1a1a1a", width=25, anchor="w").grid(row=0, column=5, padx=5, pady=3, sticky="w")
+            iid = self.corrections_tree.insert(
+                '', tk.END,
+                values=(wine_short, corr['vintage'], corr['chf_price'], suggested, correct, reason_short)
+            )
 
-            # Store entry widget with wine info
+            # Store table row with wine info
             self.correction_entries.append({
                 'wine_name': corr['wine_name'],
                 'vintage': corr['vintage'],
-                'entry': item_entry
+                'iid': iid
             })
 
         # Show the panel
-        self.corrections_frame.pack(fill=tk.BOTH, expand=False, padx=10, pady=10, before=self.winfo_children()[-1])
+        self.corrections_frame.pack(fill=tk.BOTH, expand=False, padx=10, pady=10, before=self.status_frame)
         self.update_status(f"Showing {len(corrections)} wines needing correction")
 
+    def edit_correction_cell(self, event):
+        """Open the shared editor over the 'Correct Item No.' cell of the double-clicked row"""
+        tree = self.corrections_tree
+        iid = tree.identify_row(event.y)
+        if not iid:
+            return
+        self.commit_correction_edit()
+
+        tree.see(iid)
+        bbox = tree.bbox(iid, 'correct')
+        if not bbox:
+            return
+        x, y, width, height = bbox
+
+        self.correction_editor_row = iid
+        self.correction_editor.delete(0, tk.END)
+        self.correction_editor.insert(0, tree.set(iid, 'correct'))
+        self._editor_yview = tuple(tree.yview())
+        self.correction_editor.place(x=x, y=y, width=width, height=height)
+        self.correction_editor.focus_set()
+        self.correction_editor.select_range(0, tk.END)
+
+    def on_corrections_scroll(self, first, last):
+        """Keep the scrollbar in sync and save any open edit before its row moves away from the editor"""
+        self.corrections_scrollbar.set(first, last)
+        if self.correction_editor_row is not None and tuple(self.corrections_tree.yview()) != self._editor_yview:
+            self.commit_correction_edit()
+
+    def commit_correction_edit(self, event=None):
+        """Write the editor's value back into its row and hide the editor"""
+        if self.correction_editor_row is not None:
+            self.corrections_tree.set(self.correction_editor_row, 'correct', self.correction_editor.get().strip())
+        self.cancel_correction_edit()
+
+    def cancel_correction_edit(self, event=None):
+        """Hide the editor without saving"""
+        self.correction_editor_row = None
+        self.correction_editor.place_forget()
+
     def hide_corrections_panel(self):
         """Hide the corrections panel"""
-        self.corrections_frame.pack_forget()
+        if self.corrections_frame is not None:
+            self.corrections_frame.pack_forget()
         self.update_status("Corrections panel hidden")
 
     def apply_interactive_corrections(self):
@@ -1006,22 +1384,24 @@ class AVUEchoSpinner(tk.Tk):
             messagebox.showwarning("No Corrections", "No corrections to apply.")
             return
 
+        # Keep a value that is still being typed in the table editor
+        self.commit_correction_edit()
+
         corrections = []
         invalid_count = 0
 
         for entry_info in self.correction_entries:
-            item_no = entry_info['entry'].get().strip()
+            item_no = self.corrections_tree.set(entry_info['iid'], 'correct').strip()
 
             if item_no:
-                # Validate Item No is numeric
-                try:
-                    int(item_no)
+                # Validate Item No is numeric (same check as apply_corrections.py)
+                if item_no.isdigit():
                     corrections.append({
                         'wine_name': entry_info['wine_name'],
                         'vintage': entry_info['vintage'],
                         'item_no': item_no
                     })
-                except ValueError:
+                else:
                     invalid_count += 1
 
         if invalid_count > 0:
@@ -1031,63 +1411,71 @@ class AVUEchoSpinner(tk.Tk):
             messagebox.showwarning("No Valid Corrections", "No valid corrections to apply.")
             return
 
-        # Apply corrections to learning database
-        try:
-            from datetime import datetime
+        # Apply corrections to learning database on the worker thread, after any running job
+        def run():
+            try:
+                from datetime import datetime
 
-            # Load existing database keys to avoid duplicates
-            existing_keys = set()
-            if Path(LEARNING_DB).exists():
-                with open(LEARNING_DB, 'r', encoding='utf-8') as f:
+                new_count = 0
+                duplicate_count = 0
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                # One binary handle for both passes: read existing keys, then append at EOF
+                with open(LEARNING_DB, 'a+b') as f:
+                    # Load existing database keys (as raw bytes) to avoid duplicates
+                    f.seek(0)
+                    existing_keys = set()
                     for line in f:
                         line = line.strip()
-                        if line and not line.startswith('#'):
-                            parts = line.split(' | ')
+                        if line and not line.startswith(b'#'):
+                            parts = line.split(b' | ', 3)
                             if len(parts) >= 3:
-                                key = f"{parts[0]}|{parts[1]}|{parts[2]}"
-                                existing_keys.add(key)
-
-            # Write new corrections
-            new_count = 0
-            duplicate_count = 0
-
-            with open(LEARNING_DB, 'a', encoding='utf-8') as f:
-                for corr in corrections:
-                    key = f"{corr['wine_name']}|{corr['vintage']}|{corr['item_no']}"
-
-                    if key not in existing_keys:
-                        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        entry_line = f"{corr['wine_name']} | {corr['vintage']} | {corr['item_no']} | {timestamp} (GUI correction)\n"
-                        f.write(entry_line)
-                        existing_keys.add(key)
-                        new_count += 1
-                    else:
-                        duplicate_count += 1
+                                existing_keys.add(b'|'.join(parts[:3]))
 
-            # Show success message
-            msg = f"Applied {new_count} corrections to learning database"
-            if duplicate_count > 0:
-                msg += f"\nSkipped {duplicate_count} duplicates"
+                    # Collect new corrections, then append them in one write
+                    new_lines = []
+                    for corr in corrections:
+                        key = f"{corr['wine_name']}|{corr['vintage']}|{corr['item_no']}".encode('utf-8')
 
-            messagebox.showinfo("Success", msg)
+                        if key not in existing_keys:
+                            new_lines.append(f"{corr['wine_name']} | {corr['vintage']} | {corr['item_no']} | {timestamp} (GUI correction)\n")
+                            existing_keys.add(key)
+                            new_count += 1
+                        else:
+                            duplicate_count += 1
 
-            # Hide panel and refresh database display
-            self.hide_corrections_panel()
-            self.refresh_learning_db()
+                    if new_lines:
+                        f.seek(0, os.SEEK_END)
+                        f.write(''.join(new_lines).encode('utf-8'))
 
-            self.update_status(f"Applied {new_count} corrections successfully")
+                # Show success message
+                msg = f"Applied {new_count} corrections to learning database"
+                if duplicate_count > 0:
+                    msg += f"\nSkipped {duplicate_count} duplicates"
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to apply corrections:\n{e}")
-            self.update_status(f"Error applying corrections: {str(e)}")
+                def finish():
+                    messagebox.showinfo("Success", msg)
+
+                    # Hide panel and refresh database display
+                    self.hide_corrections_panel()
+                    self.schedule_refresh()
+
+                    self.update_status(f"Applied {new_count} corrections successfully")
+
+                self.call_in_ui(finish)
+
+            except Exception as e:
+                self.call_in_ui(messagebox.showerror, "Error", f"Failed to apply corrections:\n{e}")
+                self.update_status(f"Error applying corrections: {str(e)}")
+
+        self.start_job(run)
 
     def load_corrections_manually(self):
         """Allow user to manually select a CORRECTIONS_NEEDED file to load"""
-        corrections_dir = rf"{BASE_DIR}\Outputs\Detailed match results"
         filename = filedialog.askopenfilename(
             title="Select Corrections File",
             filetypes=[("Text Files", "CORRECTIONS_NEEDED_*.txt"), ("All Files", "*.*")],
-            initialdir=corrections_dir
+            initialdir=CORRECTIONS_DIR
         )
 
         if filename:
@@ -1095,21 +1483,10 @@ class AVUEchoSpinner(tk.Tk):
 
     def check_for_corrections_file(self):
         """Check if a new CORRECTIONS_NEEDED file was created and show panel"""
-        import glob
-
-        corrections_dir = rf"{BASE_DIR}\Outputs\Detailed match results"
-        pattern = str(Path(corrections_dir) / "CORRECTIONS_NEEDED_*.txt")
-        corrections_files = glob.glob(pattern)
-
-        if corrections_files:
-            # Sort by modification time (most recent first)
-            corrections_files.sort(key=lambda x: Path(x).stat().st_mtime, reverse=True)
-            latest_file = corrections_files[0]
-
-            # Check if file is less than 5 minutes old
-            file_age = Path(latest_file).stat().st_mtime
-            current_time = Path(latest_file).stat().st_mtime
+        # Same scandir-based lookup the apply_corrections script uses
+        latest_file = find_latest_corrections_file(CORRECTIONS_DIR)
 
+        if latest_file:
             # Show corrections panel
             self.show_corrections_panel(latest_file)
 
@@ -1119,6 +1496,12 @@ def main():
     app = AVUEchoSpinner()
     app.mainloop()
 
+    # The executor's worker thread is joined at interpreter exit, so a job still
+    # running would keep a windowless process alive until it finished
+    if app.job_running():
+        sys.stdout.flush()
+        os._exit(0)
+
 
 if __name__ == "__main__":
     main()
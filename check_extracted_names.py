@@ -5,14 +5,13 @@ import io
 # Fix encoding for Windows console
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_184830.xlsx')
+df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_184830.xlsx', nrows=30)
 
 print('Columns (first 5):', df.columns.tolist()[:5])
 print('\nFirst 30 wines from "Extracted Wine Name (from Multi.txt)" column:')
 print('='*80)
 
-for i, name in enumerate(df['Extracted Wine Name (from Multi.txt)'].head(30), 1):
-    print(f'{i}. {name}')
+print('\n'.join(f'{i}. {name}' for i, name in enumerate(df['Extracted Wine Name (from Multi.txt)'], 1)))
 
 print('\n' + '='*80)
 print('\nExpected order (from user):')
@@ -5,13 +5,12 @@ import io
 # Fix encoding for Windows console
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_185222.xlsx')
+df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_185222.xlsx', usecols=['Extracted Wine Name (from Multi.txt)'], nrows=65)
 
 print('First 65 wines from Excel (Extracted from Multi.txt):')
 print('='*100)
 
-for i, name in enumerate(df['Extracted Wine Name (from Multi.txt)'].head(65), 1):
-    print(f'{i}. {name}')
+print('\n'.join(f'{i}. {name}' for i, name in enumerate(df['Extracted Wine Name (from Multi.txt)'], 1)))
 
 print('\n' + '='*100)
 print('\nExpected wine names (from user):')
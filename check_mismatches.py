@@ -5,18 +5,15 @@ import io
 # Fix encoding for Windows console
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_185222.xlsx')
+cols = ['Extracted Wine Name (from Multi.txt)', 'Producer Name', 'Wine Name', 'Item No. Int', 'Minimum Quantity']
+
+df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_185222.xlsx', usecols=cols, nrows=20)
 
 print('First 20 rows - checking for mismatches:')
 print('='*150)
 
-for i in range(20):
-    extracted = df.iloc[i]['Extracted Wine Name (from Multi.txt)']
-    producer = df.iloc[i]['Producer Name']
-    wine_db = df.iloc[i]['Wine Name']
-    item_no = df.iloc[i]['Item No. Int']
-    min_qty = df.iloc[i]['Minimum Quantity']
-
-    print(f"{i+1}. Extracted: {extracted}")
+# usecols keeps the sheet's column order, so select cols to fix the tuple layout
+for i, (extracted, producer, wine_db, item_no, min_qty) in enumerate(df[cols].itertuples(index=False, name=None), 1):
+    print(f"{i}. Extracted: {extracted}")
     print(f"   Producer: {producer} | Wine (DB): {wine_db} | Item: {item_no} | Min Qty: {min_qty}")
     print()
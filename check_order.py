@@ -1,6 +1,6 @@
 import pandas as pd
 
-df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_181320.xlsx')
+df = pd.read_excel(r'Outputs\OMT lines\Matched_OMT Main Offer List_20251124_181320.xlsx', usecols=['Item No. Int'])
 
 print('Total rows:', len(df))
 print('\nExpected Item No. sequence from console output:')
@@ -1,10 +1,11 @@
 import openpyxl
 
-wb = openpyxl.load_workbook(r'Outputs\Detailed match results\Main offer\template\Lines Template.xlsx')
+wb = openpyxl.load_workbook(r'Outputs\Detailed match results\Main offer\template\Lines Template.xlsx', read_only=True, data_only=True)
 ws = wb.active
 
 print('Template header row:')
-for col in range(1, 13):
-    cell_value = ws.cell(1, col).value
+header = next(ws.iter_rows(min_row=1, max_row=1, max_col=12, values_only=True))
+for col, cell_value in enumerate(header, 1):
     col_letter = chr(64+col) if col <= 26 else f'A{chr(64+col-26)}'
     print(f'Column {col} ({col_letter}): {cell_value}')
+wb.close()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Shared Excel Loader
+===================
+
+The converters and the matcher all read the same OMT Main Offer List and
+Stock Lines workbooks. Parsing the xlsx XML is the slowest part of every run,
+so parsed sheets are cached:
+
+1. In memory, for repeated runs inside the GUI process
+2. On disk (pickle in the user's local app-data folder), for separate runs of the scripts
+
+A cached sheet is only reused when the workbook's full path, modification
+time and size all match the version it was parsed from. Any other workbook,
+including a synced copy that kept an older modification time, is parsed
+again and replaces the cached copy.
+"""
+
+import os
+import json
+import hashlib
+import functools
+import pandas as pd
+from pathlib import Path
+
+# Per-user folder: pickles are only ever loaded from a place other users cannot write to
+CACHE_DIR = Path(os.environ.get('LOCALAPPDATA') or Path.home() / '.cache') / "AVU Month recap" / "excel_cache"
+
+
+def _cache_files(path, header, columns):
+    """Pickle file and its key sidecar for one workbook + header row + column selection"""
+    selection = json.dumps([path, header, list(columns or ())])
+    digest = hashlib.sha256(selection.encode('utf-8')).hexdigest()[:16]
+    base = CACHE_DIR / f"{Path(path).stem}_{digest}"
+    return base.with_suffix('.pkl'), base.with_suffix('.key.json')
+
+
+@functools.lru_cache(maxsize=4)
+def _read_workbook(path, mtime_ns, size, header, columns):
+    """Parse a workbook once per file version (path, mtime_ns and size form the cache key)"""
+    cache_file, key_file = _cache_files(path, header, columns)
+    key = {'path': path, 'mtime_ns': mtime_ns, 'size': size}
+
+    # Only unpickle a file this cache wrote for exactly this workbook version
+    try:
+        if json.loads(key_file.read_text(encoding='utf-8')) == key:
+            return pd.read_pickle(cache_file)
+    except Exception:
+        pass  # Missing, outdated or unreadable cache, parse the workbook below
+
+    # Only convert the wanted columns; names missing from the sheet are skipped
+    usecols = (lambda column: column in columns) if columns else None
+    df = pd.read_excel(path, header=header, usecols=usecols)
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Drop the old key first, so a half-written pickle is never taken for this version
+        key_file.unlink(missing_ok=True)
+        df.to_pickle(cache_file)
+        key_file.write_text(json.dumps(key), encoding='utf-8')
+    except OSError:
+        pass  # Cache is only an optimization; the parsed sheet is still returned
+
+    return df
+
+
+def read_excel_cached(path, header=0, columns=None):
+    """
+    Read an Excel sheet into a DataFrame, reusing the parsed sheet while the file is unchanged.
+    columns: optional list of the column names the caller uses (others are not loaded).
+    Returns a copy, so callers can add columns freely.
+    """
+    path = str(Path(path).resolve())
+    stat = os.stat(path)
+    columns = tuple(columns) if columns else None
+    return _read_workbook(path, stat.st_mtime_ns, stat.st_size, header, columns).copy()
@@ -9,18 +9,28 @@ Integrated Wine Converter
 5. Generate Lines.xlsx in correct order
 """
 
+import io
 import re
-import subprocess
 import sys
 from pathlib import Path
 from datetime import datetime
 
+import wine_item_matcher
+from job_control import check_cancelled
+
 # Configuration
 BASE_DIR = r"C:\Users\Marco.Africani\Desktop\Month recap"
 INPUT_FILE = rf"{BASE_DIR}\Inputs\Multi.txt"
 ITEMNO_GEN_FILE = rf"{BASE_DIR}\Inputs\ItemNoGenerator.txt"
 LEARNING_DB = rf"{BASE_DIR}\wine_names_learning_db.txt"
 
+# Wine line patterns, compiled once
+VINTAGE_WINE_RE = re.compile(r'([A-Z\u00C0-\u017F][^\n\d]*?)\s+(19\d{2}|20\d{2})\s*[–—-]*\s*:', re.MULTILINE)
+NON_VINTAGE_WINE_RE = re.compile(r'([A-Z\u00C0-\u017F][^\n:]*?)\s*:\s*[a-z]', re.MULTILINE)
+YEAR_RE = re.compile(r'(19\d{2}|20\d{2})')
+EMOJI_RE = re.compile(r'[✨💎💼🍷🏆⭐🎯]')
+EDITION_RE = re.compile(r'\s+\d+(?:ème|eme|th|nd|rd|st)\s+(?:Édition|Edition)', re.IGNORECASE)
+
 
 def extract_wine_names_from_multi(file_path):
     """Extract wine names and vintages from Multi.txt"""
@@ -35,14 +45,12 @@ def extract_wine_names_from_multi(file_path):
     # Pattern 3: Wine Name (no vintage) : description (for non-vintage wines)
 
     # Try to match wines with vintage first (with optional separator before colon)
-    pattern_with_vintage = r'([A-Z\u00C0-\u017F][^\n\d]*?)\s+(19\d{2}|20\d{2})\s*[–—-]*\s*:'
-
-    for match in re.finditer(pattern_with_vintage, text, re.MULTILINE):
+    for match in VINTAGE_WINE_RE.finditer(text):
         wine_name = match.group(1).strip()
         vintage = match.group(2)
 
         # Clean up emojis and special chars
-        wine_name = re.sub(r'[✨💎💼🍷🏆⭐🎯]', '', wine_name).strip()
+        wine_name = EMOJI_RE.sub('', wine_name).strip()
 
         # Skip duplicates (same wine + vintage)
         wine_key = f"{wine_name}|{vintage}"
@@ -54,18 +62,16 @@ def extract_wine_names_from_multi(file_path):
 
     # Now try to match non-vintage wines (no year before colon)
     # But skip lines that already matched above
-    pattern_non_vintage = r'([A-Z\u00C0-\u017F][^\n:]*?)\s*:\s*[a-z]'
-
-    for match in re.finditer(pattern_non_vintage, text, re.MULTILINE):
+    for match in NON_VINTAGE_WINE_RE.finditer(text):
         wine_name = match.group(1).strip()
 
         # Skip if it has a 4-digit year (already matched above)
-        if re.search(r'(19\d{2}|20\d{2})', wine_name):
+        if YEAR_RE.search(wine_name):
             continue
 
         # Clean up emojis, special chars, and edition numbers
-        wine_name = re.sub(r'[✨💎💼🍷🏆⭐🎯]', '', wine_name).strip()
-        wine_name = re.sub(r'\s+\d+(?:ème|eme|th|nd|rd|st)\s+(?:Édition|Edition)', '', wine_name, flags=re.IGNORECASE).strip()
+        wine_name = EMOJI_RE.sub('', wine_name).strip()
+        wine_name = EDITION_RE.sub('', wine_name).strip()
 
         # Skip if wine_name is too short or generic
         if len(wine_name) < 5 or wine_name.lower() in ['top wines', 'top selling', 'more expensive']:
@@ -104,29 +110,12 @@ def run_wine_matcher(size="75.0"):
     print("STEP 2: Running Wine Item Matcher...")
     print("="*80)
 
-    cmd = [sys.executable, "wine_item_matcher.py", "--size", size]
-
-    result = subprocess.run(
-        cmd,
-        cwd=Path(__file__).parent,
-        capture_output=True,
-        text=True,
-        encoding='utf-8',
-        errors='replace'
-    )
-
-    # Print output with error handling for emojis
+    # Run in-process: the matcher prints straight to our stdout and reuses
+    # the workbooks already parsed in this process (see excel_cache)
     try:
-        print(result.stdout)
-        if result.stderr:
-            print(result.stderr)
-    except UnicodeEncodeError:
-        # If Windows console can't handle UTF-8, replace problematic chars
-        print(result.stdout.encode('ascii', errors='replace').decode('ascii'))
-        if result.stderr:
-            print(result.stderr.encode('ascii', errors='replace').decode('ascii'))
-
-    return result.returncode == 0
+        return wine_item_matcher.main(["--size", size]) == 0
+    except SystemExit as e:
+        return not e.code
 
 
 def check_matching_quality(learning_db_file):
@@ -139,25 +128,24 @@ def check_matching_quality(learning_db_file):
         print("[WARN] Learning database not found. Cannot check quality.")
         return True  # Allow to proceed
 
-    with open(learning_db_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
     total = 0
     matched = 0
     not_found = 0
 
-    for line in lines:
-        line = line.strip()
-        if line and not line.startswith('#'):
-            parts = line.split(' | ')
-            if len(parts) >= 3:
-                total += 1
-                item_no = parts[2].split()[0]
-
-                if item_no == 'NOT_FOUND':
-                    not_found += 1
-                else:
-                    matched += 1
+    # Stream the file; only the counts are kept
+    with open(learning_db_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                parts = line.split(' | ', 3)
+                if len(parts) >= 3:
+                    total += 1
+                    item_no = parts[2].split()[0]
+
+                    if item_no == 'NOT_FOUND':
+                        not_found += 1
+                    else:
+                        matched += 1
 
     if total == 0:
         print("[WARN] No entries found in learning database.")
@@ -181,8 +169,8 @@ def check_matching_quality(learning_db_file):
         return True
 
 
-def main():
-    """Main workflow"""
+def main(argv=None):
+    """Main workflow (takes no options; argv is accepted so all scripts share one entry point)"""
     print("="*80)
     print("INTEGRATED WINE CONVERTER")
     print("="*80)
@@ -216,6 +204,7 @@ def main():
         return 1
 
     # STEP 2: Run wine_item_matcher.py
+    check_cancelled()  # Stop between steps if the GUI's Cancel button was pressed
     try:
         success = run_wine_matcher(size="75.0")
         if not success:
@@ -226,6 +215,7 @@ def main():
         return 1
 
     # STEP 3: Check matching quality
+    check_cancelled()
     if not check_matching_quality(LEARNING_DB):
         print("\n" + "="*80)
         print("STOPPING HERE - MATCHING QUALITY TOO LOW")
@@ -254,5 +244,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     exit_code = main()
     sys.exit(exit_code)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Job Cancellation
+================
+
+The GUI runs the pipeline scripts in-process on its worker thread, so a
+running script cannot be killed the way a subprocess could. Instead the
+scripts call check_cancelled() in their long loops and stop as soon as the
+GUI's Cancel button has set CANCEL_EVENT. When a script is run from the
+command line the event is never set and the checks cost nothing.
+"""
+
+import threading
+
+# Set by the GUI to ask the running script to stop; cleared when a job starts
+CANCEL_EVENT = threading.Event()
+
+
+class JobCancelled(BaseException):
+    """Raised inside a script once the user cancelled the running job
+
+    Derives from BaseException, like KeyboardInterrupt, so the scripts'
+    `except Exception` error handlers do not swallow it.
+    """
+
+
+def check_cancelled():
+    """Raise JobCancelled if the user asked the running job to stop"""
+    if CANCEL_EVENT.is_set():
+        raise JobCancelled("Cancelled by user")
@@ -0,0 +1,44 @@
+"""Learning DB index must follow in-place edits of the text file, not only appends"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from apply_corrections import LearningDBIndex
+
+
+def write_db(path, item_no):
+    path.write_text(
+        "# Wine Name | Vintage | Item No. | Timestamp\n"
+        f"Barolo | 2019 | {item_no} | 2025-01-01 10:00:00\n",
+        encoding='utf-8'
+    )
+
+
+def test_growing_in_place_edit_rebuilds_index(tmp_path):
+    db = tmp_path / "wine_names_learning_db.txt"
+    write_db(db, "111")
+    with LearningDBIndex(str(db)) as idx:
+        assert idx.contains(("Barolo", "2019", "111"))
+
+    # Item No. 111 -> 1111 makes the file longer, but it is not an append
+    write_db(db, "1111")
+    with LearningDBIndex(str(db)) as idx:
+        assert idx.contains(("Barolo", "2019", "1111"))
+        assert not idx.contains(("Barolo", "2019", "111"))
+        assert len(idx) == 1
+
+
+def test_append_is_imported_incrementally(tmp_path):
+    db = tmp_path / "wine_names_learning_db.txt"
+    write_db(db, "111")
+    with LearningDBIndex(str(db)) as idx:
+        assert len(idx) == 1
+
+    with open(db, 'a', encoding='utf-8') as f:
+        f.write("Chablis | 2020 | 222 | 2025-01-02 10:00:00\n")
+    with LearningDBIndex(str(db)) as idx:
+        assert idx.contains(("Barolo", "2019", "111"))
+        assert idx.contains(("Chablis", "2020", "222"))
+        assert len(idx) == 2
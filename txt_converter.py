@@ -13,6 +13,8 @@ import openpyxl
 from shutil import copy2
 import requests
 
+from excel_cache import read_excel_cached
+
 # Configuration
 BASE_DIR = r"C:\Users\Marco.Africani\Desktop\Month recap"
 DATABASE_DIR = r"C:\Users\Marco.Africani\OneDrive - AVU SA\AVU CPI Campaign\Puzzle_control_Reports\SOURCE_FILES"
@@ -50,11 +52,11 @@ def load_learning_database():
         for line in lines:
             line = line.strip()
             if line and not line.startswith('#'):
-                parts = line.split(' | ')
+                parts = line.split(' | ', 3)
                 if len(parts) >= 3:
                     wine_name = parts[0].strip()
                     vintage = parts[1].strip()
-                    item_no = parts[2].split()[0].strip()
+                    item_no = parts[2].split(None, 1)[0]
 
                     if item_no != 'NOT_FOUND' and item_no.isdigit():
                         # Normalize wine name for lookup
@@ -77,23 +79,60 @@ def load_learning_database():
 def load_databases():
     """Load Stock Lines and OMT databases once at startup"""
     print("Loading Stock Lines database...")
-    stock_df = pd.read_excel(STOCK_FILE_PATH)
+    stock_df = read_excel_cached(STOCK_FILE_PATH)
     print(f"[OK] Loaded {len(stock_df)} items from Stock Lines.xlsx")
 
     print("Loading OMT Main Offer List...")
-    omt_df = pd.read_excel(OMT_FILE_PATH)
+    omt_df = read_excel_cached(OMT_FILE_PATH)
     print(f"[OK] Loaded {len(omt_df)} rows from OMT Main Offer List.xlsx")
 
     # Pre-process for faster lookups
     omt_df['Item No. Int'] = pd.to_numeric(omt_df['Item No.'], errors='coerce').astype('Int64')
     omt_df['Schedule DateTime'] = pd.to_datetime(omt_df['Schedule DateTime'])
 
+    # Keep only offers that every OMT lookup accepts:
+    # Campaign Sub-Type = Normal, Campaign Type = PRIVATE,
+    # Competitor Code empty (Rule 1), Campaign Status = Sent (Rule 2)
+    omt_df = omt_df[
+        (omt_df['Campaign Sub-Type'] == 'Normal') &
+        (omt_df['Campaign Type'] == 'PRIVATE') &
+        (omt_df['Competitor Code'].isna() | (omt_df['Competitor Code'] == '')) &
+        (omt_df['Campaign Status'] == 'Sent')
+    ].copy()
+
+    # Rounded lookup keys, computed once instead of for every price
+    stock_df['Price Key'] = stock_df['OMT Last Private Offer Price'].astype(float).round(2)
+    # Lowercase, hyphen-free wine names for the name filter in match_chf_to_eur
+    stock_df['Wine Name Key'] = [
+        str(name).lower().replace('-', ' ')
+        for name in stock_df.get('Wine Name', pd.Series('', index=stock_df.index))
+    ]
+    omt_df['Price Key'] = omt_df['Unit Price'].astype(float).round(2)
+    omt_df['Min Qty Key'] = omt_df['Minimum Quantity'].astype(float)
+
     # Load learning database
     learning_db = load_learning_database()
 
     return stock_df, omt_df, learning_db
 
 
+def build_price_indexes(stock_df, omt_df):
+    """
+    Group row positions by the keys the matcher looks up, so each price
+    lookup is a dict hit instead of a scan over the whole sheet.
+    Returns (stock rows by price, OMT rows by (Item No., price, min quantity))
+    """
+    stock_by_price = stock_df.groupby('Price Key', sort=False).indices
+    omt_by_offer = omt_df.groupby(['Item No. Int', 'Price Key', 'Min Qty Key'], sort=False).indices
+    return stock_by_price, omt_by_offer
+
+
+def find_omt_offers(omt_df, omt_by_offer, item_no, price, min_quantity):
+    """OMT rows for Item No. + Unit Price (CHF) + Minimum Quantity, in sheet order"""
+    positions = omt_by_offer.get((item_no, round(price, 2), float(min_quantity)), [])
+    return omt_df.iloc[positions]
+
+
 def extract_wine_name_vintage(text_before_price):
     """
     Extract wine name and vintage from text before price
@@ -168,15 +207,17 @@ def extract_wine_name_vintage(text_before_price):
     return None, None
 
 
-def match_chf_to_eur(chf_price, wine_name, vintage, stock_df, omt_df, learning_db, min_quantity=0, size_filter=None):
+def match_chf_to_eur(chf_price, wine_name, vintage, stock_df, omt_df, learning_db, price_indexes, min_quantity=0, size_filter=None):
     """
     IMPROVED: Use learning database first, then try wine name + vintage + price match, then price-only fallback
 
     Args:
+        price_indexes: (stock_by_price, omt_by_offer) from build_price_indexes
         size_filter: Optional size filter (e.g., 75.0 for standard, 150.0 for Magnum)
     """
     try:
         chf_float = float(chf_price)
+        stock_by_price, omt_by_offer = price_indexes
 
         # Step 0: Check learning database first (if wine_name and vintage are available)
         if wine_name and vintage and learning_db:
@@ -198,16 +239,8 @@ def match_chf_to_eur(chf_price, wine_name, vintage, stock_df, omt_df, learning_d
                     stock_row = stock_match.iloc[0]
 
                     # Find in OMT with the learned Item No. + price + min_quantity
-                    # FILTERS: Competitor Code must be empty, Campaign Status must be 'Sent'
-                    omt_matches = omt_df[
-                        (omt_df['Item No. Int'] == learned_item_no) &
-                        (omt_df['Unit Price'].astype(float).round(2) == round(chf_float, 2)) &
-                        (omt_df['Minimum Quantity'].astype(float) == float(min_quantity)) &
-                        (omt_df['Campaign Sub-Type'] == 'Normal') &
-                        (omt_df['Campaign Type'] == 'PRIVATE') &
-                        (omt_df['Competitor Code'].isna() | (omt_df['Competitor Code'] == '')) &  # Rule 1: Competitor Code empty
-                        (omt_df['Campaign Status'] == 'Sent')  # Rule 2: Campaign Status = Sent
-                    ]
+                    # (load_databases already dropped offers failing the Campaign/Competitor/Status filters)
+                    omt_matches = find_omt_offers(omt_df, omt_by_offer, learned_item_no, chf_float, min_quantity)
 
                     if len(omt_matches) > 0:
                         omt_row = omt_matches.iloc[0]
@@ -225,9 +258,7 @@ def match_chf_to_eur(chf_price, wine_name, vintage, stock_df, omt_df, learning_d
                         }
 
         # Step 1: Find in Stock Lines by OMT Last Private Offer Price
-        stock_matches = stock_df[
-            stock_df['OMT Last Private Offer Price'].astype(float).round(2) == round(chf_float, 2)
-        ]
+        stock_matches = stock_df.iloc[stock_by_price.get(round(chf_float, 2), [])]
 
         # Apply size filter if specified (Rule 3: Filter by bottle size for Magnums)
         if size_filter is not None:
@@ -254,23 +285,20 @@ def match_chf_to_eur(chf_price, wine_name, vintage, stock_df, omt_df, learning_d
                 # Normalize: replace hyphens with spaces for comparison
                 clean_name_normalized = clean_name.replace('-', ' ')
 
+                # Check if significant parts of the name appear in the database wine name
+                # Split by spaces and take first 3 significant words
+                name_parts = [p for p in clean_name_normalized.split() if len(p) > 3][:3]
+
                 # Try to find wines with matching name parts
-                name_matches = []
-                for _, row in vintage_matches.iterrows():
-                    db_wine_name = str(row.get('Wine Name', '')).lower()
-                    # Normalize database name too
-                    db_wine_normalized = db_wine_name.replace('-', ' ')
-
-                    # Check if significant parts of the name appear in the database wine name
-                    # Split by spaces and take first 3 significant words
-                    name_parts = [p for p in clean_name_normalized.split() if len(p) > 3][:3]
-
-                    if name_parts and any(part in db_wine_normalized for part in name_parts):
-                        name_matches.append(row)
-                        used_name_filter = True  # We found a name match!
-
-                if len(name_matches) > 0:
-                    name_filtered_matches = pd.DataFrame(name_matches)
+                # (database names were lowercased and hyphen-normalized once in load_databases)
+                name_mask = [
+                    bool(name_parts) and any(part in db_wine_normalized for part in name_parts)
+                    for db_wine_normalized in vintage_matches['Wine Name Key']
+                ]
+
+                if any(name_mask):
+                    name_filtered_matches = vintage_matches[name_mask]
+                    used_name_filter = True  # We found a name match!
                 else:
                     # If no name matches but we have vintage matches, use vintage matches
                     name_filtered_matches = vintage_matches
@@ -284,16 +312,8 @@ def match_chf_to_eur(chf_price, wine_name, vintage, stock_df, omt_df, learning_d
 
             # BULLETPROOF MATCH: Item No. + Unit Price (CHF) + Minimum Quantity
             # FILTERS: Campaign Sub-Type = Normal, Campaign Type = PRIVATE,
-            #          Competitor Code empty, Campaign Status = Sent
-            omt_matches = omt_df[
-                (omt_df['Item No. Int'] == item_no) &
-                (omt_df['Unit Price'].astype(float).round(2) == round(chf_float, 2)) &
-                (omt_df['Minimum Quantity'].astype(float) == float(min_quantity)) &
-                (omt_df['Campaign Sub-Type'] == 'Normal') &
-                (omt_df['Campaign Type'] == 'PRIVATE') &
-                (omt_df['Competitor Code'].isna() | (omt_df['Competitor Code'] == '')) &  # Rule 1: Competitor Code empty
-                (omt_df['Campaign Status'] == 'Sent')  # Rule 2: Campaign Status = Sent
-            ]
+            #          Competitor Code empty, Campaign Status = Sent (applied in load_databases)
+            omt_matches = find_omt_offers(omt_df, omt_by_offer, item_no, chf_float, min_quantity)
 
             for _, omt_row in omt_matches.iterrows():
                 all_candidates.append({
@@ -350,6 +370,8 @@ def convert_txt_file_fast(enable_translations=True):
 
     # Load databases once
     stock_df, omt_df, learning_db = load_databases()
+    price_indexes = build_price_indexes(stock_df, omt_df)
+    _, omt_by_offer = price_indexes
 
     # Load input file
     print(f"[OK] Loaded input file: {INPUT_FILE_PATH}")
@@ -412,7 +434,7 @@ def convert_txt_file_fast(enable_translations=True):
             size_filter = 75.0   # Standard bottle size
 
         # Match the first price (min_quantity=0)
-        item_info = match_chf_to_eur(price_value, wine_name, vintage, stock_df, omt_df, learning_db, min_quantity=0, size_filter=size_filter)
+        item_info = match_chf_to_eur(price_value, wine_name, vintage, stock_df, omt_df, learning_db, price_indexes, min_quantity=0, size_filter=size_filter)
 
         if item_info:
             # Add order index to preserve original position from Multi.txt
@@ -448,15 +470,7 @@ def convert_txt_file_fast(enable_translations=True):
                     stock_row = item_info['stock_row']
 
                     # Find in OMT with min_quantity=36
-                    omt_matches_36 = omt_df[
-                        (omt_df['Item No. Int'] == item_no) &
-                        (omt_df['Unit Price'].astype(float).round(2) == round(second_price_value, 2)) &
-                        (omt_df['Minimum Quantity'].astype(float) == 36.0) &
-                        (omt_df['Campaign Sub-Type'] == 'Normal') &
-                        (omt_df['Campaign Type'] == 'PRIVATE') &
-                        (omt_df['Competitor Code'].isna() | (omt_df['Competitor Code'] == '')) &  # Rule 1
-                        (omt_df['Campaign Status'] == 'Sent')  # Rule 2
-                    ]
+                    omt_matches_36 = find_omt_offers(omt_df, omt_by_offer, item_no, second_price_value, 36)
 
                     if len(omt_matches_36) > 0:
                         omt_row_36 = omt_matches_36.iloc[0]
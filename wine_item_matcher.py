@@ -22,13 +22,14 @@ import pandas as pd
 import sys
 import io
 import re
+import functools
 import argparse
 from datetime import datetime
 from difflib import SequenceMatcher
 from pathlib import Path
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+from excel_cache import read_excel_cached
+from job_control import check_cancelled
 
 # Configuration
 BASE_DIR = r"C:\Users\Marco.Africani\Desktop\Month recap"
@@ -82,25 +83,42 @@ def normalize_wine_name(name):
     return name.strip()
 
 
-def calculate_similarity(text1, text2):
+def normalize_wine_names(names):
+    """Normalize a whole name column once (as text, like the scoring loop reads it)"""
+    return [normalize_wine_name(str(name)) for name in names]
+
+
+def calculate_similarity(text1, text2, threshold=None):
     """
     Calculate similarity ratio between two strings (0-1).
     Uses normalized versions for better matching.
     """
-    text1_norm = normalize_wine_name(text1)
-    text2_norm = normalize_wine_name(text2)
+    return normalized_similarity(normalize_wine_name(text1), normalize_wine_name(text2), threshold)
+
 
+@functools.lru_cache(maxsize=100_000)
+def normalized_similarity(text1_norm, text2_norm, threshold=None):
+    """
+    Similarity ratio between two already normalized names (0-1).
+    Memoized, so re-running the matcher in the GUI session skips pairs it already scored.
+    If threshold is given, returns 0.0 as soon as the cheap upper bounds
+    show the ratio cannot reach it (scores that can reach it are unchanged).
+    """
     if not text1_norm or not text2_norm:
         return 0.0
 
-    # Full string similarity
-    full_ratio = SequenceMatcher(None, text1_norm, text2_norm).ratio()
+    matcher = SequenceMatcher(None, text1_norm, text2_norm)
 
     # Check if one contains the other (partial match)
     if text1_norm in text2_norm or text2_norm in text1_norm:
-        return max(full_ratio, 0.8)
+        return max(matcher.ratio(), 0.8)
 
-    return full_ratio
+    # Skip the full comparison for candidates that cannot pass
+    if threshold is not None and (matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold):
+        return 0.0
+
+    # Full string similarity
+    return matcher.ratio()
 
 
 def extract_vintage_from_text(text):
@@ -178,12 +196,12 @@ def load_learning_database(learning_db_path):
         return learning_map
 
     try:
-        with open(learning_db_path, 'r', encoding='utf-8') as f:
+        with open(learning_db_path, 'r', encoding='utf-8', buffering=1 << 20) as f:
             for line in f:
                 line = line.strip()
                 if line and not line.startswith('#'):
                     # Parse: Wine Name | Vintage | Item No. | Timestamp
-                    parts = line.split(' | ')
+                    parts = line.split(' | ', 3)
                     if len(parts) >= 3:
                         wine_name = parts[0].strip()
                         vintage_str = parts[1].strip()
@@ -214,7 +232,12 @@ def load_learning_database(learning_db_path):
 def load_excel_database(excel_path):
     """Load wine database from Excel"""
     try:
-        df = pd.read_excel(excel_path)
+        df = read_excel_cached(excel_path, columns=[
+            WINE_NAME_COL, VINTAGE_COL, ITEM_NO_COL, PRODUCER_COL, SIZE_COL, 'Schedule DateTime'
+        ])
+
+        # Normalize names once here instead of for every candidate in find_best_match
+        df['Wine_Name_Norm'] = normalize_wine_names(df[WINE_NAME_COL])
 
         # Convert vintage to int for matching
         df['Vintage_Int'] = df[VINTAGE_COL].apply(
@@ -243,7 +266,9 @@ def load_stock_database(stock_path):
     """Load fallback wine stock database from Detailed Stock List.xlsx"""
     try:
         # Skip first 2 rows, header is on row 3 (0-indexed: skiprows=[0,1])
-        df = pd.read_excel(stock_path, header=2)
+        df = read_excel_cached(stock_path, header=2, columns=[
+            STOCK_ID_COL, STOCK_WINE_COL, STOCK_PRODUCER_COL, STOCK_VINTAGE_COL, STOCK_SIZE_COL
+        ])
 
         # Rename columns for consistency
         df = df.rename(columns={
@@ -254,6 +279,9 @@ def load_stock_database(stock_path):
             STOCK_SIZE_COL: 'Size'
         })
 
+        # Normalize names once here instead of for every candidate in find_best_match
+        df['Wine_Name_Norm'] = normalize_wine_names(df['Wine_Name'])
+
         # Convert vintage to int for matching
         df['Vintage_Int'] = df['Vintage'].apply(
             lambda x: int(x) if pd.notna(x) and str(x).replace('.0', '').isdigit() else None
@@ -272,6 +300,13 @@ def load_stock_database(stock_path):
         return None
 
 
+def column_values(df, column, default=None):
+    """Return a column as a plain list, or default for every row if the column is missing (like row.get)"""
+    if column in df.columns:
+        return df[column].tolist()
+    return [default] * len(df)
+
+
 def find_best_match(wine_name, vintage, df, threshold=0.6, learning_map=None, stock_df=None, preferred_size=75.0):
     """
     Find best matching wine using learning database first, then Excel database, then stock database.
@@ -338,6 +373,7 @@ def find_best_match(wine_name, vintage, df, threshold=0.6, learning_map=None, st
 
     # PRIORITY 2: Fuzzy matching in primary Excel (slower, but comprehensive)
     candidates = []
+    wine_name_norm = normalize_wine_name(wine_name)
 
     # Filter by vintage if provided
     if vintage:
@@ -350,18 +386,26 @@ def find_best_match(wine_name, vintage, df, threshold=0.6, learning_map=None, st
         df_filtered = df_filtered[df_filtered[SIZE_COL] == preferred_size].copy()
 
     if len(df_filtered) > 0:
-        # Calculate similarity for each wine
-        for _, row in df_filtered.iterrows():
-            excel_wine_name = str(row.get(WINE_NAME_COL, ''))
-            similarity = calculate_similarity(wine_name, excel_wine_name)
+        # Calculate similarity for each wine (plain column lists instead of a Series per row)
+        rows = zip(
+            column_values(df_filtered, WINE_NAME_COL, ''),
+            column_values(df_filtered, 'Wine_Name_Norm', ''),
+            column_values(df_filtered, 'Vintage_Int'),
+            column_values(df_filtered, ITEM_NO_COL),
+            column_values(df_filtered, PRODUCER_COL, ''),
+            column_values(df_filtered, SIZE_COL, ''),
+        )
+        for excel_wine_name, excel_wine_norm, row_vintage, row_item_no, row_producer, row_size in rows:
+            excel_wine_name = str(excel_wine_name)
+            similarity = normalized_similarity(wine_name_norm, excel_wine_norm, threshold)
 
             if similarity >= threshold:
                 candidates.append({
                     'wine_name': excel_wine_name,
-                    'vintage': row.get('Vintage_Int'),
-                    'item_no': row.get(ITEM_NO_COL),
-                    'producer': row.get(PRODUCER_COL, ''),
-                    'size': row.get(SIZE_COL, ''),
+                    'vintage': row_vintage,
+                    'item_no': row_item_no,
+                    'producer': row_producer,
+                    'size': row_size,
                     'similarity': similarity,
                     'source': 'excel_primary'
                 })
@@ -386,18 +430,26 @@ def find_best_match(wine_name, vintage, df, threshold=0.6, learning_map=None, st
             stock_filtered = stock_filtered[stock_filtered['Size'] == preferred_size].copy()
 
         if len(stock_filtered) > 0:
-            # Calculate similarity for each wine
-            for _, row in stock_filtered.iterrows():
-                stock_wine_name = str(row.get('Wine_Name', ''))
-                similarity = calculate_similarity(wine_name, stock_wine_name)
+            # Calculate similarity for each wine (plain column lists instead of a Series per row)
+            rows = zip(
+                column_values(stock_filtered, 'Wine_Name', ''),
+                column_values(stock_filtered, 'Wine_Name_Norm', ''),
+                column_values(stock_filtered, 'Vintage_Int'),
+                column_values(stock_filtered, 'Item_No'),
+                column_values(stock_filtered, 'Producer', ''),
+                column_values(stock_filtered, 'Size', ''),
+            )
+            for stock_wine_name, stock_wine_norm, row_vintage, row_item_no, row_producer, row_size in rows:
+                stock_wine_name = str(stock_wine_name)
+                similarity = normalized_similarity(wine_name_norm, stock_wine_norm, threshold)
 
                 if similarity >= threshold:
                     candidates.append({
                         'wine_name': stock_wine_name,
-                        'vintage': row.get('Vintage_Int'),
-                        'item_no': row.get('Item_No'),
-                        'producer': row.get('Producer', ''),
-                        'size': row.get('Size', ''),
+                        'vintage': row_vintage,
+                        'item_no': row_item_no,
+                        'producer': row_producer,
+                        'size': row_size,
                         'similarity': similarity,
                         'source': 'stock_fallback'
                     })
@@ -419,26 +471,26 @@ def update_learning_database(wine_entries, learning_db_path):
     """
     # Load existing database as unique keys (wine|vintage|item_no)
     existing_keys = set()
-    existing_lines = []
+    db_path = Path(learning_db_path)
 
-    if Path(learning_db_path).exists():
+    if db_path.exists():
         try:
-            with open(learning_db_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        existing_lines.append(line)
-                        # Extract key: wine_name|vintage|item_no (ignore timestamp)
-                        parts = line.split(' | ')
-                        if len(parts) >= 3:
-                            key = f"{parts[0]}|{parts[1]}|{parts[2]}"
-                            existing_keys.add(key)
+            with open(learning_db_path, 'r', encoding='utf-8', buffering=1 << 20) as f:
+                # Extract key: wine_name|vintage|item_no (ignore timestamp)
+                existing_keys.update(
+                    f"{parts[0]}|{parts[1]}|{parts[2]}"
+                    for line in f
+                    if not line.lstrip().startswith('#')
+                    for parts in [line.strip().split(' | ', 3)]
+                    if len(parts) >= 3
+                )
         except Exception as e:
             print(f"⚠️  Warning: Could not read learning database: {e}")
 
     # Add new entries (only if unique)
     new_entries = []
     duplicate_count = 0
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     for entry in wine_entries:
         wine_name = entry.get('wine_name', '')
@@ -454,7 +506,7 @@ def update_learning_database(wine_entries, learning_db_path):
             # Only add if not already in database
             if key not in existing_keys:
                 # Format: Wine Name | Vintage | Item No. | Timestamp
-                entry_line = f"{wine_name} | {vintage_str} | {item_no_str} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+                entry_line = f"{wine_name} | {vintage_str} | {item_no_str} | {timestamp}"
                 new_entries.append(entry_line)
                 existing_keys.add(key)
             else:
@@ -463,7 +515,7 @@ def update_learning_database(wine_entries, learning_db_path):
     # Write updated database
     try:
         with open(learning_db_path, 'a', encoding='utf-8') as f:
-            if not Path(learning_db_path).exists() or Path(learning_db_path).stat().st_size == 0:
+            if db_path.stat().st_size == 0:
                 # Write header for new file
                 f.write("# Wine Names Learning Database\n")
                 f.write("# Format: Wine Name | Vintage | Item No. | Timestamp\n")
@@ -568,62 +620,66 @@ def generate_output_report(wine_entries, output_dir):
     output_file = Path(output_dir) / f"ItemNo_Results_{timestamp}.txt"
 
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # Header
-            f.write("="*100 + "\n")
-            f.write("WINE ITEM NUMBER MATCHING RESULTS\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("="*100 + "\n\n")
-
-            # Summary statistics
-            total = len(wine_entries)
-            matched = sum(1 for e in wine_entries if e.get('matched_item_no'))
-            not_matched = total - matched
-
-            f.write("SUMMARY\n")
-            f.write("-"*100 + "\n")
-            f.write(f"Total wines processed: {total}\n")
-            f.write(f"Successfully matched: {matched} ({matched/total*100:.1f}%)\n")
-            f.write(f"Not matched: {not_matched} ({not_matched/total*100:.1f}%)\n")
-            f.write("\n\n")
-
-            # Results table
-            f.write("RESULTS TABLE\n")
-            f.write("-"*100 + "\n")
-            f.write(f"{'Wine Name':<40} {'Vintage':<10} {'Item No.':<12} {'Similarity':<12} {'Status'}\n")
-            f.write("-"*100 + "\n")
-
-            for entry in wine_entries:
-                wine_name = entry.get('wine_name', '')[:38]
-                vintage = str(entry.get('vintage', 'N/A'))
-                item_no = str(entry.get('matched_item_no', ''))
-                similarity = entry.get('similarity', 0.0)
-                status = '✅ MATCHED' if item_no else '❌ NOT FOUND'
-
-                similarity_str = f"{similarity:.1%}" if similarity > 0 else "N/A"
-
-                f.write(f"{wine_name:<40} {vintage:<10} {item_no:<12} {similarity_str:<12} {status}\n")
-
-            f.write("\n\n")
-
-            # Detailed results
-            f.write("DETAILED RESULTS\n")
-            f.write("="*100 + "\n\n")
-
-            for i, entry in enumerate(wine_entries, 1):
-                f.write(f"[{i}] {entry.get('original_text', '')}\n")
-                f.write(f"    Parsed: {entry.get('wine_name', '')} | Vintage: {entry.get('vintage', 'N/A')}\n")
+        # Build the whole report in memory, then write the file in one go
+        report = io.StringIO()
+
+        # Header
+        report.write("="*100 + "\n")
+        report.write("WINE ITEM NUMBER MATCHING RESULTS\n")
+        report.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        report.write("="*100 + "\n\n")
+
+        # Summary statistics
+        total = len(wine_entries)
+        matched = sum(1 for e in wine_entries if e.get('matched_item_no'))
+        not_matched = total - matched
+
+        report.write("SUMMARY\n")
+        report.write("-"*100 + "\n")
+        report.write(f"Total wines processed: {total}\n")
+        report.write(f"Successfully matched: {matched} ({matched/total*100:.1f}%)\n")
+        report.write(f"Not matched: {not_matched} ({not_matched/total*100:.1f}%)\n")
+        report.write("\n\n")
+
+        # Results table
+        report.write("RESULTS TABLE\n")
+        report.write("-"*100 + "\n")
+        report.write(f"{'Wine Name':<40} {'Vintage':<10} {'Item No.':<12} {'Similarity':<12} {'Status'}\n")
+        report.write("-"*100 + "\n")
+
+        for entry in wine_entries:
+            wine_name = entry.get('wine_name', '')[:38]
+            vintage = str(entry.get('vintage', 'N/A'))
+            item_no = str(entry.get('matched_item_no', ''))
+            similarity = entry.get('similarity', 0.0)
+            status = '✅ MATCHED' if item_no else '❌ NOT FOUND'
+
+            similarity_str = f"{similarity:.1%}" if similarity > 0 else "N/A"
+
+            report.write(f"{wine_name:<40} {vintage:<10} {item_no:<12} {similarity_str:<12} {status}\n")
+
+        report.write("\n\n")
+
+        # Detailed results
+        report.write("DETAILED RESULTS\n")
+        report.write("="*100 + "\n\n")
+
+        for i, entry in enumerate(wine_entries, 1):
+            report.write(f"[{i}] {entry.get('original_text', '')}\n")
+            report.write(f"    Parsed: {entry.get('wine_name', '')} | Vintage: {entry.get('vintage', 'N/A')}\n")
+
+            if entry.get('matched_item_no'):
+                report.write(f"    ✅ MATCHED: Item No. {entry.get('matched_item_no')}\n")
+                report.write(f"       Excel Name: {entry.get('excel_wine_name', '')}\n")
+                report.write(f"       Producer: {entry.get('producer', 'N/A')}\n")
+                report.write(f"       Size: {entry.get('size', 'N/A')} cl\n")
+                report.write(f"       Similarity: {entry.get('similarity', 0):.1%}\n")
+            else:
+                report.write(f"    ❌ NOT FOUND in database\n")
 
-                if entry.get('matched_item_no'):
-                    f.write(f"    ✅ MATCHED: Item No. {entry.get('matched_item_no')}\n")
-                    f.write(f"       Excel Name: {entry.get('excel_wine_name', '')}\n")
-                    f.write(f"       Producer: {entry.get('producer', 'N/A')}\n")
-                    f.write(f"       Size: {entry.get('size', 'N/A')} cl\n")
-                    f.write(f"       Similarity: {entry.get('similarity', 0):.1%}\n")
-                else:
-                    f.write(f"    ❌ NOT FOUND in database\n")
+            report.write("\n")
 
-                f.write("\n")
+        output_file.write_text(report.getvalue(), encoding='utf-8')
 
         print(f"\n✅ Results report saved: {output_file}")
         return output_file
@@ -633,15 +689,15 @@ def generate_output_report(wine_entries, output_dir):
         return None
 
 
-def main():
-    """Main execution function"""
+def main(argv=None):
+    """Main execution function (argv defaults to the command line arguments). Returns 0 on success, 1 on failure."""
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Wine Item Number Matcher')
     parser.add_argument('--input', type=str, default=INPUT_FILE,
                        help='Input file with wine names')
     parser.add_argument('--size', type=float, default=75.0,
                        help='Preferred bottle size (75.0, 150.0, 300.0). Omit for all sizes.')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     input_file = args.input
     preferred_size = args.size
@@ -663,7 +719,7 @@ def main():
     print("Step 2: Loading primary database...")
     df = load_excel_database(EXCEL_FILE)
     if df is None:
-        return
+        return 1
     print()
 
     # Load fallback stock database
@@ -676,7 +732,7 @@ def main():
     wines = parse_input_file(input_file)
     if wines is None or len(wines) == 0:
         print("❌ No wines found in input file")
-        return
+        return 1
     print(f"✅ Found {len(wines)} wines to process\n")
 
     # Match wines
@@ -686,6 +742,7 @@ def main():
     wine_entries = []
 
     for wine in wines:
+        check_cancelled()  # Stop here if the GUI's Cancel button was pressed
         wine_name = wine['wine_name']
         vintage = wine['vintage']
         original_text = wine['original_text']
@@ -781,6 +838,10 @@ def main():
     if correction_file:
         print(f"   - Corrections needed: {correction_file.name}")
 
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.exit(main())
@@ -10,17 +10,18 @@
 # ==============================================================================
 
 import pandas as pd
+import numpy as np
 from docx import Document
 import re
 from docx.enum.text import WD_COLOR_INDEX
 import math
+import functools
 from collections import Counter, defaultdict
 from difflib import SequenceMatcher
 import sys
 import io
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+from excel_cache import read_excel_cached
 
 # --- CONFIGURATION (UPDATE THESE PATHS) ---
 BASE_DIR = r"C:\Users\Marco.Africani\Desktop\Month recap"
@@ -58,10 +59,64 @@ NUMBER_THEN_CHF = r"(\d+(?:['\u2019]\d{3})*)\s+[Cc][Hh][Ff]"
 # Pattern to catch "NUMBER.XXCHF" format (no space before CHF, e.g., "33.00CHF")
 NUMBER_NOSPACE_CHF = r"(\d+(?:['\u2019]\d{3})*\.\d{2})[Cc][Hh][Ff]"
 
+# Pattern to catch "Magnum XX.XX" (number after Magnum keyword, no CHF indicator)
+MAGNUM_NUMBER = r"\bMagnum\s+(\d+(?:['\u2019]\d{3})*\.\d{2})"
+
+# Pattern to catch "36x XX.XX" (number after 36x, not directly followed by CHF)
+THIRTYSIX_NUMBER = r"\b36\s*x\s+(\d+(?:['\u2019]\d{3})*\.\d{2})(?![Cc][Hh][Ff])"
+
+# Price context checks, compiled once since they run for every number found in the document
+CURRENCY_CONTEXT_RE = re.compile(r'\b(CHF|EUR|chf|eur)\b')
+PRODUCER_RE = re.compile(r'(Aalto|Colgin|Roederer|Louis Roederer)', re.IGNORECASE)
+
+# Number clean-up patterns applied to every run of the document
+DIGIT_APOSTROPHE_RE = re.compile(r"(?<=\d)['\u2019\u0027\u02BC\u2018](?=\d)")  # Thousands separator between digits
+APOSTROPHE_RE = re.compile(r"['\u2019\u0027\u02BC\u2018]")
+MALFORMED_DECIMAL_RE = re.compile(r'(\d)\.0\.(\d{2})\b')  # "1150.0.00"
+REPEATED_DOT_DECIMAL_RE = re.compile(r'(\d)\.{2,}(\d{2})\b')  # "1150...00"
+MALFORMED_ANY_RE = re.compile(r'\.0\.\d{2}|\.{2,}')
+
+# Price context indicators, one combined pattern per side of the price
+CHF_SUFFIX_RE = re.compile(r'chf\s*$', re.IGNORECASE)
+MARKET_PRICE_BEFORE_RE = re.compile(
+    r'market\s+price\s+chf\s*$'     # "market price CHF" directly before number
+    r'|approximately\s+chf\s*$'      # "approximately CHF" directly before
+    r'|around\s+chf\s*$'             # "around CHF" directly before
+    r'|stands\s+at.*chf\s*$'         # "stands at ... CHF" directly before
+)
+MARKET_PRICE_AFTER_RE = re.compile(r'^\s*\)?\s*\(?\s*market\s+price')  # "(market price" right after
+THIRTYSIX_X_RE = re.compile(r'36\s*x\b')
+THIRTYSIX_BEFORE_RE = re.compile(
+    r'36\s*\+\s*bottle'                       # "36+ bottle" before
+    r'|36\s+bottles?\s*(?:at|for)?\s*chf'      # price at end of "36 bottles" phrase
+)
+THIRTYSIX_AFTER_RE = re.compile(
+    r'^[^a-z]*36\s*\+\s*bottle'               # "36+ bottle" right after
+    r'|if\s+you\s+take\s+36\s+bottle'        # "if you take 36 bottles" after
+)
+MAGNUM_WORD_RE = re.compile(r'\bmagnum\b')
+VINTAGE_YEAR_RE = re.compile(r'\b(19[9]\d|20[0-3]\d)\b')
+
+# Wine name patterns for extract_wine_name_from_context (called for every ambiguous price)
+COLON_NAME_RE = re.compile(r'([A-ZÀ-ÿ][^\n:]{3,60})[:]\s*')
+TRAILING_WORD_RE = re.compile(r'\s+(at|from|for|with|the|a|an)$', re.IGNORECASE)
+PRICE_WORD_RE = re.compile(r'chf|price|offer', re.IGNORECASE)
+QUOTED_NAME_RE = re.compile(r'["""]([^"""]{3,60})["""]')
+CAPITAL_RE = re.compile(r'[A-ZÀ-ÿ]')
+CHATEAU_NAME_RE = re.compile(r'\b([CcDd]h[âa]teau|Domaine|Dom\.)\s+([A-ZÀ-ÿ][^\n:,.]{3,40})')
+CAPITALIZED_PHRASE_RE = re.compile(r'\b([A-ZÀ-ÿ][a-zà-ÿ]+(?:\s+[A-ZÀ-ÿ][a-zà-ÿ]+){0,3})\s+(?:\d{4})?')
+LINE_START_NAME_RE = re.compile(r'^([A-ZÀ-ÿ][^\n:–-]{3,60}?)[:–-]')
+TRAILING_YEAR_RE = re.compile(r'\s+\d{4}\s*$')
+TRAILING_NOISE_RE = re.compile(r'\s+(at|from|for|with|price|the|a|an)$', re.IGNORECASE)
+
 # Fuzzy matching threshold (0-1, where 1 is exact match)
 FUZZY_MATCH_THRESHOLD = 0.5
 
+# Common filler words ignored by the word-level similarity
+FILLER_WORDS = frozenset({'the', 'de', 'di', 'du', 'della', 'des', 'le', 'la', 'del'})
+
 
+@functools.lru_cache(maxsize=4096)
 def normalize_wine_name(name):
     """
     Normalize wine name for better matching:
@@ -89,6 +144,11 @@ def normalize_wine_name(name):
     return name.strip()
 
 
+def name_tokens(name_norm):
+    """Key words of a normalized wine name, without filler words"""
+    return frozenset(name_norm.split()) - FILLER_WORDS
+
+
 def calculate_similarity(text1, text2):
     """
     Calculate similarity ratio between two strings (0-1).
@@ -96,7 +156,16 @@ def calculate_similarity(text1, text2):
     """
     text1_norm = normalize_wine_name(text1)
     text2_norm = normalize_wine_name(text2)
+    return normalized_similarity(text1_norm, name_tokens(text1_norm), text2_norm, name_tokens(text2_norm))
 
+
+@functools.lru_cache(maxsize=4096)
+def normalized_similarity(text1_norm, words1, text2_norm, words2):
+    """
+    Similarity between two normalized names and their name_tokens() sets.
+    Lets callers prepare one side once when comparing it against many names.
+    Memoized: the same context/option pairs come back for every repeated price.
+    """
     if not text1_norm or not text2_norm:
         return 0.0
 
@@ -109,14 +178,6 @@ def calculate_similarity(text1, text2):
         full_similarity = max(full_similarity, 0.7)
 
     # Word-level matching (check if key words are shared)
-    words1 = set(text1_norm.split())
-    words2 = set(text2_norm.split())
-
-    # Remove common filler words
-    filler_words = {'the', 'de', 'di', 'du', 'della', 'des', 'le', 'la', 'del'}
-    words1 = words1 - filler_words
-    words2 = words2 - filler_words
-
     if words1 and words2:
         # Jaccard similarity for word sets
         word_overlap = len(words1 & words2) / len(words1 | words2)
@@ -137,36 +198,20 @@ def detect_market_price_context(text, price_match_start):
     context_before = text[max(0, price_match_start - 40):price_match_start].lower()
     context_after = text[price_match_start:min(len(text), price_match_start + 30)].lower()
 
-    # Market price indicators that must be IMMEDIATELY before "CHF"
-    # Pattern: "market price stands at approximately CHF 100"
-    #          "swiss market price ... CHF 100"
-    immediate_before_patterns = [
-        r'market\s+price\s+chf\s*$',           # "market price CHF" directly before number
-        r'approximately\s+chf\s*$',             # "approximately CHF" directly before
-        r'around\s+chf\s*$',                    # "around CHF" directly before
-        r'stands\s+at.*chf\s*$',                # "stands at ... CHF" directly before
-    ]
-
     # Check if "CHF" appears right before the price position in original text
     # This helps identify if this is part of "CHF XX" pattern
     chf_before_price = text[max(0, price_match_start - 5):price_match_start]
-    has_chf_prefix = bool(re.search(r'chf\s*$', chf_before_price, re.IGNORECASE))
+    has_chf_prefix = bool(CHF_SUFFIX_RE.search(chf_before_price))
 
     # Only apply market price detection if CHF prefix exists
-    if has_chf_prefix:
-        for pattern in immediate_before_patterns:
-            if re.search(pattern, context_before):
-                return True
+    # (all "IMMEDIATELY before CHF" indicators are checked in one search)
+    if has_chf_prefix and MARKET_PRICE_BEFORE_RE.search(context_before):
+        return True
 
     # Market price indicators AFTER the price (in parentheses)
     # Pattern: "100.00 EUR + VAT (market price EUR 108.00)"
-    market_indicators_after = [
-        r'^\s*\)?\s*\(?\s*market\s+price',     # "(market price" right after
-    ]
-
-    for indicator in market_indicators_after:
-        if re.search(indicator, context_after):
-            return True
+    if MARKET_PRICE_AFTER_RE.search(context_after):
+        return True
 
     return False
 
@@ -183,22 +228,13 @@ def detect_quantity_indicator(text, price_match_start):
 
     # Check for 36-bottle indicators (MUST BE VERY CLOSE)
     # Pattern 1: "36x" directly before the price (within 10 chars)
-    if re.search(r'36\s*x\b', context_before[-10:]):
+    if THIRTYSIX_X_RE.search(context_before[-10:]):
         return 36
 
-    # Pattern 2: "36+ bottle" directly before or after (within 25 chars)
-    if re.search(r'36\s*\+\s*bottle', context_before):
-        return 36
-    if re.search(r'^[^a-z]*36\s*\+\s*bottle', context_after):
+    # Patterns 2 + 4 before the price, 2 + 3 after it (one search per side)
+    if THIRTYSIX_BEFORE_RE.search(context_before):
         return 36
-
-    # Pattern 3: "if you take 36 bottles" AFTER the price (not before!)
-    # This must be in the context_after, not before
-    if re.search(r'if\s+you\s+take\s+36\s+bottle', context_after):
-        return 36
-
-    # Pattern 4: Price at end of "36 bottles" phrase (within 20 chars before)
-    if re.search(r'36\s+bottles?\s*(at|for)?\s*chf', context_before):
+    if THIRTYSIX_AFTER_RE.search(context_after):
         return 36
 
     # Default to 0 (normal price, no minimum quantity)
@@ -214,7 +250,7 @@ def detect_size_indicator(text, price_match_start):
     context_before = text[max(0, price_match_start - 50):price_match_start].lower()
 
     # Check for Magnum indicator (150cl)
-    if re.search(r'\bmagnum\b', context_before):
+    if MAGNUM_WORD_RE.search(context_before):
         return 150.0
 
     # Default to standard bottle size (75cl)
@@ -230,7 +266,7 @@ def extract_vintage_from_context(text, price_match_start):
     context = text[max(0, price_match_start - 600):min(len(text), price_match_start + 100)]
 
     # Find 4-digit years (vintage years typically 1990-2030)
-    year_matches = re.findall(r'\b(19[9]\d|20[0-3]\d)\b', context)
+    year_matches = VINTAGE_YEAR_RE.findall(context)
 
     if year_matches:
         # Return the most recent/last mentioned year
@@ -255,44 +291,41 @@ def extract_wine_name_from_context(text, price_match_start):
     # Pattern 1: FIRST colon in the context (usually the wine name at paragraph start)
     # e.g., "Château Rieussec 2019: ... price"
     # Find ALL colons, prefer the FIRST one (which is usually the wine name)
-    all_colons = list(re.finditer(r'([A-ZÀ-ÿ][^\n:]{3,60})[:]\s*', context_before))
+    all_colons = list(COLON_NAME_RE.finditer(context_before))
     if all_colons:
         # Take the FIRST colon match (likely the wine name)
         first_colon = all_colons[0]
         candidate = first_colon.group(1).strip()
         # Remove common trailing words
-        candidate = re.sub(r'\s+(at|from|for|with|the|a|an)$', '', candidate, flags=re.IGNORECASE)
+        candidate = TRAILING_WORD_RE.sub('', candidate)
         wine_candidates.append(candidate)
 
         # Also consider the LAST colon if different (might be more specific context)
         if len(all_colons) > 1:
             last_colon = all_colons[-1]
             candidate_last = last_colon.group(1).strip()
-            candidate_last = re.sub(r'\s+(at|from|for|with|the|a|an)$', '', candidate_last, flags=re.IGNORECASE)
+            candidate_last = TRAILING_WORD_RE.sub('', candidate_last)
             # Only add if it's different and doesn't contain "CHF" or price-related words
-            if candidate_last != candidate and not re.search(r'chf|price|offer', candidate_last, re.IGNORECASE):
+            if candidate_last != candidate and not PRICE_WORD_RE.search(candidate_last):
                 wine_candidates.append(candidate_last)
 
     # Pattern 2: Quoted text (wine names often in quotes)
     # e.g., "the famous "Château Pavie" at"
-    quote_matches = re.findall(r'["""]([^"""]{3,60})["""]', context_before)
+    quote_matches = QUOTED_NAME_RE.findall(context_before)
     for match in quote_matches:
         # Prefer quotes with capitalized content
-        if re.search(r'[A-ZÀ-ÿ]', match):
+        if CAPITAL_RE.search(match):
             wine_candidates.append(match.strip())
 
     # Pattern 3: Château/Domaine followed by name
     # e.g., "Château Montrose 2021"
-    chateau_pattern = re.findall(r'\b([CcDd]h[âa]teau|Domaine|Dom\.)\s+([A-ZÀ-ÿ][^\n:,.]{3,40})', context_before)
+    chateau_pattern = CHATEAU_NAME_RE.findall(context_before)
     for prefix, name in chateau_pattern:
         wine_candidates.append(f"{prefix} {name}".strip())
 
     # Pattern 4: Producer name patterns (e.g., "Penfolds 2019", "Aalto 2023")
     # Match: Capitalized word(s) optionally followed by year
-    producer_pattern = re.findall(
-        r'\b([A-ZÀ-ÿ][a-zà-ÿ]+(?:\s+[A-ZÀ-ÿ][a-zà-ÿ]+){0,3})\s+(?:\d{4})?',
-        context_before
-    )
+    producer_pattern = CAPITALIZED_PHRASE_RE.findall(context_before)
     if producer_pattern:
         # Get last few capitalized phrases
         wine_candidates.extend(producer_pattern[-3:])
@@ -300,7 +333,7 @@ def extract_wine_name_from_context(text, price_match_start):
     # Pattern 5: Text between line start and dash/colon
     # e.g., "Aalto 2023: ..." or "Dominus 2016: ..."
     line_start = context_before.split('\n')[-1] if '\n' in context_before else context_before
-    line_pattern = re.match(r'^([A-ZÀ-ÿ][^\n:–-]{3,60}?)[:–-]', line_start.strip())
+    line_pattern = LINE_START_NAME_RE.match(line_start.strip())
     if line_pattern:
         wine_candidates.append(line_pattern.group(1).strip())
 
@@ -308,9 +341,9 @@ def extract_wine_name_from_context(text, price_match_start):
     cleaned_candidates = []
     for candidate in wine_candidates:
         # Remove year patterns at the end
-        candidate = re.sub(r'\s+\d{4}\s*$', '', candidate)
+        candidate = TRAILING_YEAR_RE.sub('', candidate)
         # Remove common noise words at the end
-        candidate = re.sub(r'\s+(at|from|for|with|price|the|a|an)$', '', candidate, flags=re.IGNORECASE)
+        candidate = TRAILING_NOISE_RE.sub('', candidate)
         # Remove extra whitespace
         candidate = ' '.join(candidate.split())
         if len(candidate) >= 3:
@@ -328,7 +361,7 @@ def load_stock_lines():
     """Load Stock Lines.xlsx for direct Item No. to EUR price matching"""
     try:
         print(f"Loading Stock Lines database from: {STOCK_FILE_PATH}")
-        stock_df = pd.read_excel(STOCK_FILE_PATH)
+        stock_df = read_excel_cached(STOCK_FILE_PATH)
 
         # Column mapping based on user specification:
         # Column A: No. = Item No.
@@ -419,6 +452,13 @@ def match_price_via_stock_lines(chf_price, stock_df, omt_df, is_36_bottles=False
         return None
 
 
+def column_values(df, column, default=None):
+    """Return a column as a plain list, or default for every row if the column is missing (like row.get)"""
+    if column in df.columns:
+        return df[column].tolist()
+    return [default] * len(df)
+
+
 def load_data_and_document():
     """Loads the Excel data, creates the conversion map, and loads the Word document."""
     conversion_map = {}
@@ -434,41 +474,53 @@ def load_data_and_document():
 
     # 2. Load OMT Main Offer List (Excel File)
     try:
-        df = pd.read_excel(EXCEL_FILE_PATH)
-        df_full = df.copy()
+        df = read_excel_cached(EXCEL_FILE_PATH)
+        df_full = df  # df itself is never modified below, so no copy is needed
 
-        # Standardize columns
-        df['CHF_KEY_FORMATTED'] = df[CHF_COL].astype(float).round(2).apply(lambda x: f'{x:.2f}')
+        # Standardize keys as plain lists instead of extra DataFrame columns
+        chf_keys = np.char.mod('%.2f', df[CHF_COL].to_numpy(dtype=np.float64).round(2)).tolist()
         # Round EUR values to whole numbers (always .00 decimals)
-        df['EUR_VALUE_FORMATTED'] = df[EUR_COL].astype(float).round(0).apply(lambda x: f'{int(x)}.00')
-        df['WINE_NAME_NORMALIZED'] = df[WINE_NAME_COL].astype(str)
+        eur_values = np.char.mod('%.0f.00', df[EUR_COL].to_numpy(dtype=np.float64).round()).tolist()
+        wine_names = df[WINE_NAME_COL].astype(str).tolist()
+        # Item No. as integer keys in one vectorized pass (e.g. 1234, "1234", 1234.0 -> 1234)
+        # Non-numeric Item Numbers (e.g., "ACCESSORIES") become None and are not mapped
+        item_numbers = pd.to_numeric(pd.Series(column_values(df, ITEM_NO_COL), dtype=object), errors='coerce')
+        item_keys = [None if pd.isna(key) else key for key in np.trunc(item_numbers).astype('Int64').tolist()]
 
         # Find duplicate CHF prices (same CHF, different EUR)
-        chf_eur_mapping = df.groupby('CHF_KEY_FORMATTED')['EUR_VALUE_FORMATTED'].apply(set).to_dict()
+        chf_eur_mapping = defaultdict(set)
+        for chf, eur in zip(chf_keys, eur_values):
+            chf_eur_mapping[chf].add(eur)
         for chf, eur_set in chf_eur_mapping.items():
             if len(eur_set) > 1:
                 duplicate_chf_prices.add(chf)
 
         # Create wine data mapping with all relevant columns
-        for _, row in df.iterrows():
-            chf = row['CHF_KEY_FORMATTED']
-            eur = row['EUR_VALUE_FORMATTED']
-            wine = row['WINE_NAME_NORMALIZED']
+        # Zip plain column lists instead of iterrows(), which builds a Series per row
+        rows = zip(
+            chf_keys, eur_values, wine_names,
+            column_values(df, CAMPAIGN_SUBTYPE_COL, ''),
+            column_values(df, CAMPAIGN_TYPE_COL, ''),
+            column_values(df, SIZE_COL, 0),
+            column_values(df, MIN_QUANTITY_COL, 0),
+            column_values(df, COMPETITOR_CODE_COL),
+            column_values(df, PRODUCER_NAME_COL, ''),
+            column_values(df, VINTAGE_COL),
+            column_values(df, ITEM_NO_COL),
+            item_keys,
+        )
+        for (chf, eur, wine, campaign_subtype, campaign_type, size, min_qty,
+             competitor_code, producer_name, vintage_raw, item_no, item_key) in rows:
 
             # Extract additional columns for filtering
-            campaign_subtype = str(row.get(CAMPAIGN_SUBTYPE_COL, '')).strip().lower()
-            campaign_type = str(row.get(CAMPAIGN_TYPE_COL, '')).strip().lower()
-            size = row.get(SIZE_COL, 0)
-            min_qty = row.get(MIN_QUANTITY_COL, 0)
-            competitor_code = row.get(COMPETITOR_CODE_COL, None)
-            producer_name = str(row.get(PRODUCER_NAME_COL, '')).strip()
-            vintage_raw = row.get(VINTAGE_COL, None)
+            campaign_subtype = str(campaign_subtype).strip().lower()
+            campaign_type = str(campaign_type).strip().lower()
+            producer_name = str(producer_name).strip()
             # Convert vintage to int for proper comparison with context_vintage (which is int)
             try:
                 vintage = int(vintage_raw) if pd.notna(vintage_raw) else None
             except (ValueError, TypeError):
                 vintage = None
-            item_no = row.get(ITEM_NO_COL, None)
 
             wine_data = {
                 'wine_name': wine,
@@ -481,6 +533,7 @@ def load_data_and_document():
                 'producer_name': producer_name,
                 'vintage': vintage,
                 'item_no': item_no,
+                'item_key': item_key,
                 'chf_value': chf
             }
 
@@ -488,15 +541,8 @@ def load_data_and_document():
 
             # Build item_number_map for bulletproof matching
             # Item No. is unique per wine+vintage+size (same for qty=0 and qty=36)
-            if pd.notna(item_no):
-                try:
-                    item_key = int(float(item_no))  # Handle both int and float strings
-                    if item_key not in item_number_map:
-                        item_number_map[item_key] = []
-                    item_number_map[item_key].append(wine_data)
-                except (ValueError, TypeError):
-                    # Skip non-numeric Item Numbers (e.g., "ACCESSORIES")
-                    pass
+            if item_key is not None:
+                item_number_map.setdefault(item_key, []).append(wine_data)
 
         # For non-duplicate prices, create simple conversion map
         for chf, eur_set in chf_eur_mapping.items():
@@ -573,26 +619,26 @@ def find_best_wine_match(chf_price, context_wine_name, wine_data_map, detected_q
     # Item No. is unique per wine+vintage+size (same for both qty=0 and qty=36)
     # This works for BOTH single and multiple options - Item No. is always most reliable
     if item_number_map and context_vintage:
-        # Check all options for this CHF price
+        # The item_number_map entries for an Item No. that also have this CHF price are
+        # exactly the options below with that item_key, so one pass over the options finds
+        # the first matching entry per Item No. (Item Nos. checked in order of first appearance)
+        first_match_by_item = {}
         for option in wine_options:
-            item_no = option.get('item_no')
-            if pd.notna(item_no):
-                try:
-                    item_key = int(float(item_no))  # Handle both int and float strings
-                except (ValueError, TypeError):
-                    # Skip non-numeric Item Numbers
-                    continue
-                if item_key in item_number_map:
-                    # Get all entries for this Item No. (should be qty=0 and qty=36 variants)
-                    item_entries = item_number_map[item_key]
-                    # Check if vintage and size match
-                    for entry in item_entries:
-                        if (entry.get('vintage') == context_vintage and
-                            entry.get('size') == detected_size and
-                            entry.get('min_quantity') == detected_quantity and
-                            entry.get('chf_value') == chf_price):
-                            # BULLETPROOF MATCH!
-                            return entry['eur_value'], 'item_no_match', entry
+            item_key = option.get('item_key')  # Integer Item No., parsed once at load (None if non-numeric)
+            if item_key is None or first_match_by_item.get(item_key) is not None:
+                continue
+            # Check if vintage, size and quantity match
+            if (option.get('vintage') == context_vintage and
+                option.get('size') == detected_size and
+                option.get('min_quantity') == detected_quantity):
+                first_match_by_item[item_key] = option
+            else:
+                first_match_by_item.setdefault(item_key, None)
+
+        for entry in first_match_by_item.values():
+            if entry is not None:
+                # BULLETPROOF MATCH!
+                return entry['eur_value'], 'item_no_match', entry
 
     # Fallback: If only one option and Item No. didn't match, use it
     if len(wine_options) == 1:
@@ -681,35 +727,45 @@ def find_best_wine_match(chf_price, context_wine_name, wine_data_map, detected_q
         return filtered_options[0]['eur_value'], 'fuzzy_filtered', filtered_options[0]
 
     # Multiple options remain - use intelligent matching
+    if not filtered_options:
+        return None, 'ambiguous', None
+
+    # Distance of each option to the expected EUR (CHF * 1.08), computed once
+    # and shared by the scoring loop and the price proximity fallbacks
+    expected_eur = float(chf_price) * 1.08
+    price_diffs = [abs(float(opt['eur_value']) - expected_eur) for opt in filtered_options]
+    best_by_price = filtered_options[price_diffs.index(min(price_diffs))]
+
     if not context_wine_name and not context_producer:
         # Use price proximity (choose EUR closest to CHF * 1.08)
-        if filtered_options:
-            chf_float = float(chf_price)
-            expected_eur = chf_float * 1.08
-            best_option = min(filtered_options, key=lambda opt: abs(float(opt['eur_value']) - expected_eur))
-            return best_option['eur_value'], 'price_proximity', best_option
-        return None, 'ambiguous', None
+        return best_by_price['eur_value'], 'price_proximity', best_by_price
 
     # Calculate similarity scores for each option
+    # Normalize the context names once, not once per option
+    context_wine_norm = normalize_wine_name(context_wine_name)
+    context_wine_words = name_tokens(context_wine_norm)
+    context_producer_norm = normalize_wine_name(context_producer)
+    context_producer_words = name_tokens(context_producer_norm)
+
     scored_options = []
-    for option in filtered_options:
+    for option, price_diff in zip(filtered_options, price_diffs):
         score = 0.0
 
         # Wine name similarity
         if context_wine_name:
-            wine_similarity = calculate_similarity(context_wine_name, option['wine_name'])
+            option_norm = normalize_wine_name(option['wine_name'])
+            wine_similarity = normalized_similarity(context_wine_norm, context_wine_words,
+                                                    option_norm, name_tokens(option_norm))
             score += wine_similarity * 2.0  # Weight: 2.0
 
         # Producer name similarity
         if context_producer and option['producer_name']:
-            producer_similarity = calculate_similarity(context_producer, option['producer_name'])
+            option_norm = normalize_wine_name(option['producer_name'])
+            producer_similarity = normalized_similarity(context_producer_norm, context_producer_words,
+                                                        option_norm, name_tokens(option_norm))
             score += producer_similarity * 1.5  # Weight: 1.5
 
         # Price proximity bonus (prefer EUR closest to CHF * 1.08)
-        chf_float = float(chf_price)
-        expected_eur = chf_float * 1.08
-        eur_float = float(option['eur_value'])
-        price_diff = abs(eur_float - expected_eur)
         # Normalize: closer = higher score
         price_proximity_score = max(0, 1.0 - (price_diff / expected_eur))
         score += price_proximity_score * 0.5  # Weight: 0.5
@@ -725,9 +781,6 @@ def find_best_wine_match(chf_price, context_wine_name, wine_data_map, detected_q
         return best_option['eur_value'], 'fuzzy', best_option
 
     # Otherwise, use price proximity
-    chf_float = float(chf_price)
-    expected_eur = chf_float * 1.08
-    best_by_price = min(filtered_options, key=lambda opt: abs(float(opt['eur_value']) - expected_eur))
     return best_by_price['eur_value'], 'price_proximity', best_by_price
 
 
@@ -885,10 +938,12 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
     # Find all number matches with their positions (three patterns)
     # Pattern 1: Standard XX.XX format (including Swiss format with apostrophe like 1'500.00 or 1'500.00)
     matches_with_positions = []
+    seen_numbers = set()  # Numbers already in matches_with_positions, for O(1) duplicate checks
     for m in re.finditer(NUMBER_PATTERN, text):
         # Remove both regular apostrophe (') and curly quote (') for Excel lookup
         number_clean = m.group().replace("'", "").replace("'", "")
         matches_with_positions.append((number_clean, m.start()))
+        seen_numbers.add(number_clean)
 
     # Pattern 2: "CHF 100" style (convert to "100.00" format)
     chf_no_decimal_matches = re.finditer(CHF_NUMBER_NO_DECIMAL, text)
@@ -898,6 +953,7 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
         formatted_number = f"{number}.00"
         # Add to matches with the position of the number (not CHF)
         matches_with_positions.append((formatted_number, match.start() + match.group().find(match.group(1))))
+        seen_numbers.add(formatted_number)
 
     # Pattern 3: "190 CHF" style (NUMBER THEN CHF, without decimals)
     number_then_chf_matches = re.finditer(NUMBER_THEN_CHF, text)
@@ -905,9 +961,10 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
         # Remove both regular apostrophe and curly quote
         number = match.group(1).replace("'", "").replace("'", "")
         # Check if this number already has a decimal match (skip if so)
-        if not any(chf == f"{number}.00" or chf == number for chf, _ in matches_with_positions):
-            formatted_number = f"{number}.00"
+        formatted_number = f"{number}.00"
+        if formatted_number not in seen_numbers and number not in seen_numbers:
             matches_with_positions.append((formatted_number, match.start()))
+            seen_numbers.add(formatted_number)
 
     # Pattern 4: "33.00CHF" style (NUMBER.XX directly followed by CHF, no space)
     number_nospace_chf_matches = re.finditer(NUMBER_NOSPACE_CHF, text)
@@ -915,29 +972,30 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
         # Remove both regular apostrophe and curly quote
         number = match.group(1).replace("'", "").replace("'", "")
         # Check if already matched (avoid duplicates)
-        if not any(chf == number for chf, _ in matches_with_positions):
+        if number not in seen_numbers:
             matches_with_positions.append((number, match.start()))
+            seen_numbers.add(number)
 
     # Pattern 5: "Magnum XX.XX" style (number after Magnum keyword, no CHF indicator)
     # This is a special case for Magnum bottles where CHF may be omitted
-    magnum_pattern = r"\bMagnum\s+(\d+(?:['\u2019]\d{3})*\.\d{2})"
-    magnum_matches = re.finditer(magnum_pattern, text, re.IGNORECASE)
+    magnum_matches = re.finditer(MAGNUM_NUMBER, text, re.IGNORECASE)
     for match in magnum_matches:
         number = match.group(1).replace("'", "").replace("'", "")
         # Check if already matched (avoid duplicates)
-        if not any(chf == number for chf, _ in matches_with_positions):
+        if number not in seen_numbers:
             matches_with_positions.append((number, match.start() + match.group().find(match.group(1))))
+            seen_numbers.add(number)
 
     # Pattern 6: "36x XX.XX" style (number after 36x, may or may not have CHF)
     # Special case for 36-bottle pricing where CHF may be omitted or attached
     # This pattern should NOT match if Pattern 4 already matched (avoid "36x 33.00CHF")
-    thirtysix_pattern = r"\b36\s*x\s+(\d+(?:['\u2019]\d{3})*\.\d{2})(?![Cc][Hh][Ff])"
-    thirtysix_matches = re.finditer(thirtysix_pattern, text, re.IGNORECASE)
+    thirtysix_matches = re.finditer(THIRTYSIX_NUMBER, text, re.IGNORECASE)
     for match in thirtysix_matches:
         number = match.group(1).replace("'", "").replace("'", "")
         # Check if already matched (avoid duplicates)
-        if not any(chf == number for chf, _ in matches_with_positions):
+        if number not in seen_numbers:
             matches_with_positions.append((number, match.start() + match.group().find(match.group(1))))
+            seen_numbers.add(number)
 
     # Dictionary of replacements: {chf_str: (new_eur_str, highlight_color_index, context)}
     replacements_to_do = {}
@@ -955,7 +1013,7 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
                 context = text[context_start:context_end]
 
                 # If CHF or EUR is in the context, this is a price, not a year
-                if re.search(r'\b(CHF|EUR|chf|eur)\b', context):
+                if CURRENCY_CONTEXT_RE.search(context):
                     pass  # Don't skip, it's a price
                 else:
                     continue  # Skip, it's likely a year
@@ -979,7 +1037,7 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
         context_producer = None
         if context_wine:
             # Check if wine name contains producer patterns
-            producer_match = re.search(r'(Aalto|Colgin|Roederer|Louis Roederer)', context_wine, re.IGNORECASE)
+            producer_match = PRODUCER_RE.search(context_wine)
             if producer_match:
                 context_producer = producer_match.group(1)
 
@@ -1386,7 +1444,20 @@ def replace_and_highlight(paragraph, conversion_map, wine_data_map, duplicate_ch
     return local_replacements
 
 
-def clean_apostrophes_in_numbers(doc):
+def document_paragraphs(doc):
+    """
+    Collect the paragraphs of the document body, then of every table cell, once.
+    python-docx rebuilds these lists from the XML on every access.
+    """
+    paragraphs = list(doc.paragraphs)
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                paragraphs.extend(cell.paragraphs)
+    return paragraphs
+
+
+def clean_apostrophes_in_numbers(doc, paragraphs=None):
     """
     Clean and normalize numbers in the document:
     1. Remove apostrophes (both ' and ' and ') from numbers
@@ -1396,6 +1467,8 @@ def clean_apostrophes_in_numbers(doc):
     Example: 1'500.00 CHF -> 1500.00 CHF
     Example: 1'480'000.00 CHF -> 1480000.00 CHF
     Example: 1150.0.00 EUR -> 1150.00 EUR
+
+    paragraphs: optional result of document_paragraphs(doc), to reuse it
     """
     apostrophes_removed = 0
     malformed_fixed = 0
@@ -1409,36 +1482,35 @@ def clean_apostrophes_in_numbers(doc):
         # Step 1: Remove ALL apostrophes from numbers (handles multiple apostrophes)
         # Pattern: digit + apostrophe(s) + digit
         # This handles: ', ', ', `, ʼ, etc.
-        while re.search(r"(\d)['\u2019\u0027\u02BC\u2018](\d)", text):
-            text = re.sub(r"(\d)['\u2019\u0027\u02BC\u2018](\d)", r'\1\2', text)
+        # Lookarounds leave the digits unconsumed, so one pass also catches "1'2'3"
+        text = DIGIT_APOSTROPHE_RE.sub('', text)
 
         # Step 2: Fix malformed decimals like "1150.0.00" or "1480.0.00"
         # Pattern: digit + ".0." + digits (should be just ".digits")
-        text = re.sub(r'(\d)\.0\.(\d{2})\b', r'\1.\2', text)
+        text = MALFORMED_DECIMAL_RE.sub(r'\1.\2', text)
 
         # Step 3: Fix triple dots or more: "1150...00" -> "1150.00"
-        text = re.sub(r'(\d)\.{2,}(\d{2})\b', r'\1.\2', text)
+        text = REPEATED_DOT_DECIMAL_RE.sub(r'\1.\2', text)
 
         if text != original:
-            if re.search(r"['\u2019\u0027\u02BC\u2018]", original):
+            if APOSTROPHE_RE.search(original):
                 apostrophes_removed += 1
-            if re.search(r'\.0\.\d{2}|\.{2,}', original):
+            if MALFORMED_ANY_RE.search(original):
                 malformed_fixed += 1
 
         return text
 
-    # Process all paragraphs
-    for paragraph in doc.paragraphs:
-        for run in paragraph.runs:
-            run.text = clean_number_text(run.text)
+    if paragraphs is None:
+        paragraphs = document_paragraphs(doc)
 
-    # Process all tables
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.text = clean_number_text(run.text)
+    # Process all paragraphs (body and tables)
+    for paragraph in paragraphs:
+        for run in paragraph.runs:
+            run_text = run.text
+            cleaned = clean_number_text(run_text)
+            # Only rewrite runs that changed; setting run.text rebuilds the run's XML
+            if cleaned != run_text:
+                run.text = cleaned
 
     if apostrophes_removed > 0:
         print(f"✅ Preprocessed: removed apostrophes from {apostrophes_removed} number(s)")
@@ -1448,8 +1520,8 @@ def clean_apostrophes_in_numbers(doc):
     return doc
 
 
-def main():
-    """Main function to orchestrate the conversion process."""
+def main(argv=None):
+    """Main function to orchestrate the conversion process (takes no options; argv is accepted so all scripts share one entry point)."""
 
     print("\n" + "="*80)
     print("CHF to EUR Converter with Wine Name Matching")
@@ -1461,8 +1533,11 @@ def main():
         print("\nOperation aborted due to file loading errors.")
         return
 
+    # Body and table paragraphs, collected once for both passes below
+    paragraphs = document_paragraphs(doc)
+
     # PREPROCESSING: Remove apostrophes from numbers to avoid formatting issues
-    doc = clean_apostrophes_in_numbers(doc)
+    doc = clean_apostrophes_in_numbers(doc, paragraphs)
 
     total_replacements = 0
     all_numbers_found = []
@@ -1477,25 +1552,14 @@ def main():
     # List to track all conversions for Excel export
     conversion_records = []
 
-    # 1. Iterate through all paragraphs in the document
-    for paragraph in doc.paragraphs:
+    # Iterate through all paragraphs in the document, then those in its tables (if any)
+    for paragraph in paragraphs:
         total_replacements += replace_and_highlight(
             paragraph, conversion_map, wine_data_map,
             duplicate_chf_prices, all_numbers_found, conversion_stats, conversion_records, item_number_map,
             stock_df, df_full
         )
 
-    # 2. Iterate through all tables in the document (if any)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    total_replacements += replace_and_highlight(
-                        paragraph, conversion_map, wine_data_map,
-                        duplicate_chf_prices, all_numbers_found, conversion_stats, conversion_records, item_number_map,
-                        stock_df, df_full
-                    )
-
     # --- Statistics Report ---
     print("\n" + "="*80)
     print("CONVERSION STATISTICS")
@@ -1557,6 +1621,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     main()
 
 # ==============================================================================